@@ -1,69 +1,187 @@
 """SQLAlchemy models."""
 
-from sqlalchemy import Column, ForeignKey, Integer, String, Text
+from typing import Optional
+
+from sqlalchemy import ForeignKey, Index, Integer, SmallInteger, String, Text, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from db.session import Base
 
 
 class ClinicalTrial(Base):
     __tablename__ = "clinical_trials"
+    __table_args__ = (
+        Index("ix_ct_status_phase", "status", "phase"),
+        Index("ix_ct_therapeutic_class", "therapeutic_class"),
+        Index("ix_ct_sponsor", "sponsor"),
+        Index("ix_ct_publication_lag_days", "publication_lag_days"),
+        # yes/no flags: index only the rare "yes" rows instead of the whole column.
+        Index(
+            "ix_ct_dead_end_yes",
+            "nct_id",
+            sqlite_where=text("dead_end = 'yes'"),
+            postgresql_where=text("dead_end = 'yes'"),
+        ),
+        Index(
+            "ix_ct_has_results_yes",
+            "nct_id",
+            sqlite_where=text("has_results = 'yes'"),
+            postgresql_where=text("has_results = 'yes'"),
+        ),
+        # Trials are re-upserted on every ingest; leave page headroom so
+        # Postgres can do HOT updates. Ignored on SQLite.
+        {"postgresql_with": {"fillfactor": "80"}},
+    )
 
     # Core identifiers
-    nct_id = Column(String, primary_key=True, index=True)
-    source = Column(String)
-    secondary_id = Column(String)
-    trial_link = Column(Text)
-    title = Column(Text)
-
-    # Trial metadata
-    study_type = Column(String)
-    study_design = Column(String)
-    phase = Column(String)
-    status = Column(String)
-    sponsor = Column(String)
-    admission_date = Column(String)
-    last_update_date = Column(String)
-    has_results = Column(String)
-    results_last_update = Column(String)
-    pubmed_links = Column(Text)
-    intervention_types = Column(String)
-    primary_completion_date = Column(String)
-    publication_date = Column(String)
-    publication_scan_date = Column(String)
-    publication_lag_days = Column(Integer)
-    evidence_strength = Column(String)
-    dead_end = Column(String)
+    nct_id: Mapped[str] = mapped_column(String(32), primary_key=True, index=True)
+    source: Mapped[Optional[str]] = mapped_column(String(32))
+    secondary_id: Mapped[Optional[str]] = mapped_column(String)
+    trial_link: Mapped[Optional[str]] = mapped_column(Text)
+    title: Mapped[Optional[str]] = mapped_column(Text)
+
+    # Trial metadata. Dates are ISO-8601 strings (YYYY[-MM[-DD]]) or "NA", so
+    # lexicographic comparison matches chronological order.
+    study_type: Mapped[Optional[str]] = mapped_column(String(32))
+    study_design: Mapped[Optional[str]] = mapped_column(String(32))
+    phase: Mapped[Optional[str]] = mapped_column(String(32))
+    status: Mapped[Optional[str]] = mapped_column(String(64))
+    sponsor: Mapped[Optional[str]] = mapped_column(String(255))
+    admission_date: Mapped[Optional[str]] = mapped_column(String(10), index=True)
+    last_update_date: Mapped[Optional[str]] = mapped_column(String(10), index=True)
+    has_results: Mapped[Optional[str]] = mapped_column(String(8))
+    results_last_update: Mapped[Optional[str]] = mapped_column(String(10))
+    pubmed_links: Mapped[Optional[str]] = mapped_column(Text)
+    intervention_types: Mapped[Optional[str]] = mapped_column(String)
+    primary_completion_date: Mapped[Optional[str]] = mapped_column(String(10))
+    publication_date: Mapped[Optional[str]] = mapped_column(String(10))
+    publication_scan_date: Mapped[Optional[str]] = mapped_column(String(10))
+    publication_lag_days: Mapped[Optional[int]] = mapped_column(Integer)
+    evidence_strength: Mapped[Optional[str]] = mapped_column(String(16))
+    dead_end: Mapped[Optional[str]] = mapped_column(String(8))
 
     # Semantic classification
-    therapeutic_class = Column(String)
-    focus_tags = Column(Text)
-    pdac_match_reason = Column(Text)
+    therapeutic_class: Mapped[Optional[str]] = mapped_column(String(64))
+    focus_tags: Mapped[Optional[str]] = mapped_column(Text)
+    pdac_match_reason: Mapped[Optional[str]] = mapped_column(Text)
+
+    # Optimistic-concurrency token: ORM UPDATEs add "WHERE version = :v" and
+    # bump it, so concurrent writers fail with StaleDataError instead of
+    # silently overwriting each other.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    __mapper_args__ = {"version_id_col": version}
+
+    # The 1:1 details row is LEFT JOINed into the trial SELECT; publications are
+    # loaded in one batched SELECT instead of one query per trial.
+    # passive_deletes="all" keeps the historical behaviour of leaving child rows
+    # untouched when a trial row is deleted.
+    details: Mapped[Optional["ClinicalTrialDetails"]] = relationship(
+        back_populates="trial",
+        uselist=False,
+        lazy="joined",
+        passive_deletes="all",
+    )
+    publications: Mapped[list["ClinicalTrialPublication"]] = relationship(
+        back_populates="trial",
+        lazy="selectin",
+        passive_deletes="all",
+    )
+    # Normalized copy of focus_tags, kept in sync by the ingest pipeline.
+    tags: Mapped[set["TrialTag"]] = relationship(
+        back_populates="trial",
+        lazy="selectin",
+        collection_class=set,
+        cascade="all, delete-orphan",
+    )
+
+    @property
+    def pmids(self) -> list[str]:
+        """Numeric PMIDs from the linked publication rows."""
+        pmids = []
+        for pub in self.publications:
+            pmid = (pub.pmid or "").strip()
+            if pmid.isdigit():
+                pmids.append(pmid)
+        return pmids
 
 
 class ClinicalTrialDetails(Base):
     __tablename__ = "clinical_trial_details"
 
-    nct_id = Column(String, ForeignKey("clinical_trials.nct_id"), primary_key=True, index=True)
-    conditions = Column(Text)
-    interventions = Column(Text)
-    primary_outcomes = Column(Text)
-    secondary_outcomes = Column(Text)
-    inclusion_criteria = Column(Text)
-    exclusion_criteria = Column(Text)
-    locations = Column(Text)
-    brief_summary = Column(Text)
-    detailed_description = Column(Text)
+    nct_id: Mapped[str] = mapped_column(
+        String(32),
+        ForeignKey("clinical_trials.nct_id"),
+        primary_key=True,
+        index=True,
+    )
+    conditions: Mapped[Optional[str]] = mapped_column(Text)
+    interventions: Mapped[Optional[str]] = mapped_column(Text)
+    primary_outcomes: Mapped[Optional[str]] = mapped_column(Text)
+    secondary_outcomes: Mapped[Optional[str]] = mapped_column(Text)
+
+    # Long free-text blobs are only loaded on access (or with
+    # undefer_group("full_text")) so the joined details row stays small.
+    inclusion_criteria: Mapped[Optional[str]] = mapped_column(Text, deferred=True, deferred_group="full_text")
+    exclusion_criteria: Mapped[Optional[str]] = mapped_column(Text, deferred=True, deferred_group="full_text")
+    locations: Mapped[Optional[str]] = mapped_column(Text, deferred=True, deferred_group="full_text")
+    brief_summary: Mapped[Optional[str]] = mapped_column(Text, deferred=True, deferred_group="full_text")
+    detailed_description: Mapped[Optional[str]] = mapped_column(Text, deferred=True, deferred_group="full_text")
+
+    trial: Mapped["ClinicalTrial"] = relationship(back_populates="details")
 
 
 class ClinicalTrialPublication(Base):
     __tablename__ = "trial_publications"
+    __table_args__ = (
+        # Clusters the "all publications for a trial" lookup on one index.
+        Index("idx_trial_publications_nct_pmid", "nct_id", "pmid"),
+        Index(
+            "idx_trial_publications_full_match_yes",
+            "nct_id",
+            sqlite_where=text("is_full_match = 'yes'"),
+            postgresql_where=text("is_full_match = 'yes'"),
+        ),
+        # Date-range analytics on Postgres; a BRIN index stays a few pages in
+        # size. SQLite has no BRIN, so it is only created on Postgres.
+        Index(
+            "ix_trial_publications_date_brin",
+            "publication_date",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    nct_id: Mapped[Optional[str]] = mapped_column(
+        String(32),
+        ForeignKey("clinical_trials.nct_id"),
+    )
+    pmid: Mapped[Optional[str]] = mapped_column(String(16), index=True)
+    doi: Mapped[Optional[str]] = mapped_column(String, index=True)
+    publication_date: Mapped[Optional[str]] = mapped_column(String(10))
+    publication_title: Mapped[Optional[str]] = mapped_column(Text)
+    journal: Mapped[Optional[str]] = mapped_column(Text)
+    # Plain text rather than an Enum: legacy or hand-edited rows may hold
+    # methods the ingest's PUBLICATION_METHOD_CONFIDENCE does not list, and
+    # they must still load.
+    match_method: Mapped[Optional[str]] = mapped_column(String(32))
+    confidence: Mapped[Optional[int]] = mapped_column(SmallInteger)  # 0-100
+    is_full_match: Mapped[Optional[str]] = mapped_column(String(8))
+
+    trial: Mapped[Optional["ClinicalTrial"]] = relationship(back_populates="publications")
+
+
+class TrialTag(Base):
+    __tablename__ = "trial_tags"
+    __table_args__ = (
+        # Reverse lookup: all trials carrying a tag.
+        Index("ix_trial_tags_tag_nct", "tag", "nct_id"),
+    )
+
+    nct_id: Mapped[str] = mapped_column(
+        String(32),
+        ForeignKey("clinical_trials.nct_id"),
+        primary_key=True,
+    )
+    tag: Mapped[str] = mapped_column(String(64), primary_key=True)
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    nct_id = Column(String, ForeignKey("clinical_trials.nct_id"), index=True)
-    pmid = Column(String, index=True)
-    doi = Column(String, index=True)
-    publication_date = Column(String)
-    publication_title = Column(Text)
-    journal = Column(Text)
-    match_method = Column(String)
-    confidence = Column(Integer)
-    is_full_match = Column(String)
+    trial: Mapped["ClinicalTrial"] = relationship(back_populates="tags")
@@ -0,0 +1,75 @@
+"""Reusable ORM query helpers."""
+
+from sqlalchemy import select
+from sqlalchemy.orm import load_only, raiseload, selectinload
+
+from db.models import ClinicalTrial
+
+
+def load_trial_fully(session, nct_ids) -> list[ClinicalTrial]:
+    """
+    Load trials with details, publications and tags eagerly.
+
+    Any other relationship access raises instead of silently issuing one
+    lazy query per row, so N+1 regressions fail loudly.
+    """
+    stmt = (
+        select(ClinicalTrial)
+        .where(ClinicalTrial.nct_id.in_(list(nct_ids)))
+        .options(
+            selectinload(ClinicalTrial.details).undefer_group("full_text"),
+            selectinload(ClinicalTrial.publications),
+            selectinload(ClinicalTrial.tags),
+            raiseload("*"),
+        )
+        .order_by(ClinicalTrial.nct_id)
+    )
+    return list(session.execute(stmt).scalars().all())
+
+
+def list_trial_summaries(session) -> list[ClinicalTrial]:
+    """
+    Load the columns list views show (nct_id, title, status, phase).
+
+    Only those columns are SELECTed and the details join is skipped; touching
+    any other attribute raises rather than lazily loading it.
+    """
+    stmt = (
+        select(ClinicalTrial)
+        .options(
+            load_only(
+                ClinicalTrial.nct_id,
+                ClinicalTrial.title,
+                ClinicalTrial.status,
+                ClinicalTrial.phase,
+                raiseload=True,
+            ),
+            raiseload("*"),
+        )
+        .order_by(ClinicalTrial.nct_id)
+    )
+    return list(session.execute(stmt).scalars().all())
+
+
+def get_trials_by_ids(session, nct_ids, *options) -> dict[str, ClinicalTrial]:
+    """
+    Map nct_id -> trial for the given ids that exist.
+
+    Trials already in the session identity map are reused as-is; the rest
+    are fetched in a single IN query rather than one get() per id, with any
+    loader ``options`` applied.
+    """
+    mapper = ClinicalTrial.__mapper__
+    found = {}
+    missing = []
+    for nct_id in {i for i in nct_ids if i}:
+        trial = session.identity_map.get(mapper.identity_key_from_primary_key([nct_id]))
+        if trial is not None:
+            found[nct_id] = trial
+        else:
+            missing.append(nct_id)
+    if missing:
+        stmt = select(ClinicalTrial).where(ClinicalTrial.nct_id.in_(missing)).options(*options)
+        for trial in session.execute(stmt).scalars():
+            found[trial.nct_id] = trial
+    return found
@@ -3,23 +3,42 @@ Database session and engine configuration.
 Uses SQLite by default.
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import sqlite3
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 DATABASE_URL = "sqlite:///./pdac_trials.db"
 
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False},  # needed for SQLite
+    query_cache_size=1200,  # compiled-statement cache (default 500)
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets the dashboard keep reading while ingest writes; with WAL,
+    # synchronous=NORMAL cannot corrupt the file and skips an fsync per commit.
+    # SQLite-only pragmas: leave other backends (e.g. Postgres) untouched.
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine,
 )
 
-Base = declarative_base()
+
+class Base(DeclarativeBase):
+    pass
 
 
 def init_db():
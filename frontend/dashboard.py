@@ -5,30 +5,40 @@ Run:
     streamlit run frontend/dashboard.py
 """
 
+from functools import lru_cache, partial
 from pathlib import Path
+import copy
 import math
+import re
 import sqlite3
 import shlex
 
-import altair as alt
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 import streamlit as st
 
-try:
-    from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
-    HAS_AGGRID = True
-except Exception:
-    HAS_AGGRID = False
+# streamlit-aggrid is imported on first use inside render_explorer, so the
+# page starts drawing before that package loads.
+_AGGRID = None
 
 
-ROOT = Path(__file__).resolve().parents[1]
-DB_PATH = ROOT / "pdac_trials.db"
+def _load_aggrid():
+    """(AgGrid, GridOptionsBuilder, JsCode), or () when streamlit-aggrid is unavailable."""
+    global _AGGRID
+    if _AGGRID is None:
+        try:
+            from st_aggrid import AgGrid, GridOptionsBuilder, JsCode
+            _AGGRID = (AgGrid, GridOptionsBuilder, JsCode)
+        except Exception:
+            _AGGRID = ()
+    return _AGGRID
 
 
-def split_tags(tags: str) -> list[str]:
-    if not tags:
-        return []
-    return [t.strip() for t in tags.split(",") if t.strip()]
+ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = ROOT / "pdac_trials.db"
 
 
 def split_csv_values(value: str) -> list[str]:
@@ -37,20 +47,74 @@ def split_csv_values(value: str) -> list[str]:
     return [item.strip() for item in str(value).split(",") if item.strip() and item.strip() != "NA"]
 
 
-def first_pubmed_link(value: str) -> str:
-    if not value or str(value).strip() == "NA":
-        return "NA"
-    links = [item.strip() for item in str(value).split("|") if item.strip()]
-    return links[0] if links else "NA"
+def first_pubmed_links(values: pd.Series) -> pd.Series:
+    """
+    First non-blank entry of each "|"-separated link list, "NA" when there
+    is none.
+    """
+    first = values.fillna("").astype(str).str.extract(r"^[\s|]*([^|]*)", expand=False).str.strip()
+    return first.mask(first.eq(""), "NA")
 
 
-def _year_from_date(value: str) -> str:
-    if not value:
-        return ""
-    value = str(value).strip()
-    if len(value) >= 4 and value[:4].isdigit():
-        return value[:4]
-    return ""
+SEARCH_TEXT_COLUMN = "search_text"
+# Hidden per-row year columns, derived once in load_trials.
+YEAR_COLUMNS = {"admission_date": "admission_year", "last_update_date": "update_year"}
+
+
+def build_search_text(df: pd.DataFrame) -> pd.Series:
+    """
+    Lower-cased " | "-joined text of every column, matched by the global query.
+
+    Joined and lower-cased in single Arrow kernels over the columns' UTF-8
+    buffers rather than pairwise Series concatenation.
+    """
+    arrays = [pa.array(df[col].astype(str), type=pa.large_string()) for col in df.columns]
+    separator = pa.scalar(" | ", type=pa.large_string())
+    joined = pc.utf8_lower(pc.binary_join_element_wise(*arrays, separator))
+    return pd.Series(pd.array(joined, dtype="str"), index=df.index)
+
+
+def _tokenize(query: str) -> list[str]:
+    """
+    Whitespace-separated terms with double-quoted phrases kept whole, as
+    shlex.split would give, without shlex's per-character state machine.
+    Single quotes and backslashes still go through shlex; an unbalanced
+    quote falls back to a plain split.
+    """
+    if "'" in query or "\\" in query:
+        try:
+            return shlex.split(query)
+        except ValueError:
+            return query.split()
+    parts = query.split('"')
+    if len(parts) % 2 == 0:
+        return query.split()
+
+    tokens: list[str] = []
+    current = None  # token still open at the end of the previous part
+    for idx, part in enumerate(parts):
+        if idx % 2:
+            current = (current or "") + part
+            continue
+        if not part:
+            continue
+        if part[0].isspace() and current is not None:
+            tokens.append(current)
+            current = None
+        words = part.split()
+        if not words:
+            continue
+        if current is not None:
+            words[0] = current + words[0]
+        tokens.extend(words[:-1])
+        if part[-1].isspace():
+            tokens.append(words[-1])
+            current = None
+        else:
+            current = words[-1]
+    if current is not None:
+        tokens.append(current)
+    return tokens
 
 
 def _build_query_mask(df: pd.DataFrame, query: str) -> pd.Series:
@@ -65,11 +129,7 @@ def _build_query_mask(df: pd.DataFrame, query: str) -> pd.Series:
     if not query:
         return pd.Series(True, index=df.index)
 
-    normalized = query.replace(",", " OR ")
-    try:
-        tokens = shlex.split(normalized)
-    except Exception:
-        tokens = normalized.split()
+    tokens = _tokenize(query.replace(",", " OR "))
 
     # Build OR groups containing AND terms.
     groups: list[list[str]] = [[]]
@@ -87,185 +147,343 @@ def _build_query_mask(df: pd.DataFrame, query: str) -> pd.Series:
     if not groups:
         return pd.Series(True, index=df.index)
 
-    row_text = df.fillna("").astype(str).agg(" | ".join, axis=1)
-    final_mask = pd.Series(False, index=df.index)
+    if SEARCH_TEXT_COLUMN in df.columns:
+        row_text = df[SEARCH_TEXT_COLUMN]
+    else:
+        row_text = build_search_text(df.fillna(""))
+    # Scan each distinct term once, then combine the hit arrays with NumPy
+    # bitwise ops; repeated terms across OR groups reuse the same scan.
+    # Terms are matched as escaped regexes: on Arrow strings that runs RE2,
+    # whose literal search is several times faster than Arrow's plain
+    # substring kernel. (An alternation of terms loses RE2's literal
+    # prefilter and is slower than separate scans.)
+    term_hits: dict[str, np.ndarray] = {}
+    final_mask = np.zeros(len(df), dtype=bool)
     for and_terms in groups:
-        group_mask = pd.Series(True, index=df.index)
+        group_mask = np.ones(len(df), dtype=bool)
         for term in and_terms:
-            group_mask = group_mask & row_text.str.contains(
-                term,
-                case=False,
-                regex=False,
-                na=False,
-            )
-        final_mask = final_mask | group_mask
-    return final_mask
+            term = term.lower()
+            if term not in term_hits:
+                term_hits[term] = row_text.str.contains(
+                    re.escape(term), regex=True, na=False
+                ).to_numpy(dtype=bool)
+            group_mask &= term_hits[term]
+        final_mask |= group_mask
+    return pd.Series(final_mask, index=df.index)
+
+
+# Explorer columns, in display order, with their header labels.
+DISPLAY_COLUMNS = {
+    "nct_id": "Trial ID",
+    "nct_ref_id": "NCT ID",
+    "source": "Source",
+    "trial_link": "Trial Link",
+    "title": "Title",
+    "study_type": "Study Type",
+    "study_design": "Study Design",
+    "phase": "Phase",
+    "status": "Status",
+    "sponsor": "Sponsor",
+    "therapeutic_class": "Therapeutic Class",
+    "admission_date": "Admission Date",
+    "last_update_date": "Last Update",
+    "primary_completion_date": "Primary Completion",
+    "has_results": "Results",
+    "results_last_update": "Results Update",
+    "pubmed_links": "Paper Link",
+    "publication_date": "Publication Date",
+    "publication_lag_days": "Publication Lag (days)",
+    "publication_count": "Publication Count",
+    "publication_match_methods": "Publication Match Methods",
+    "evidence_strength": "Evidence Strength",
+    "dead_end": "Dead End",
+    "conditions": "Conditions",
+    "interventions": "Interventions",
+    "intervention_types": "Intervention Types",
+    "primary_outcomes": "Primary Outcomes",
+    "secondary_outcomes": "Secondary Outcomes",
+    "inclusion_criteria": "Inclusion Criteria",
+    "exclusion_criteria": "Exclusion Criteria",
+    "locations": "Locations",
+    "brief_summary": "Brief Summary",
+    "detailed_description": "Detailed Description",
+    "focus_tags": "Tags",
+    "pdac_match_reason": "Match Reason",
+}
+
+
+def nct_ref_ids(df: pd.DataFrame) -> pd.Series:
+    """
+    The row's NCT id: nct_id itself, else the first NCT id listed in
+    secondary_id, else "NA".
+    """
+    nct_ids = df["nct_id"].astype(str)
+    from_secondary = (
+        df["secondary_id"].astype(str)
+        .str.extract(r"(?:^|,)\s*(NCT[^,]*)", expand=False)
+        .str.strip()
+        .fillna("NA")
+    )
+    return nct_ids.where(nct_ids.str.startswith("NCT"), from_secondary)
 
 
 def build_display_df(filtered: pd.DataFrame) -> pd.DataFrame:
-    display_src = filtered.copy()
-    display_src["nct_ref_id"] = display_src.apply(
-        lambda row: (
-            row["nct_id"]
-            if str(row.get("nct_id", "")).startswith("NCT")
-            else next(
-                (
-                    part.strip()
-                    for part in str(row.get("secondary_id", "")).split(",")
-                    if part.strip().startswith("NCT")
-                ),
-                "NA",
-            )
-        ),
-        axis=1,
+    # Rows arrive in nct_id order from load_trials' ORDER BY; selecting the
+    # columns already yields a new frame, so no sort or copy is needed.
+    if "nct_ref_id" in filtered.columns:
+        display_src = filtered
+    else:
+        display_src = filtered.assign(nct_ref_id=nct_ref_ids(filtered))
+    return display_src[list(DISPLAY_COLUMNS)].rename(columns=DISPLAY_COLUMNS)
+
+
+FACET_COLUMNS = [
+    "therapeutic_class",
+    "study_design",
+    "study_type",
+    "phase",
+    "status",
+    "sponsor",
+    "source",
+    "has_results",
+    "evidence_strength",
+    "dead_end",
+]
+
+
+# Low-cardinality columns stored as pandas categoricals: isin/unique/value_counts
+# then work on integer codes instead of per-row string comparisons. Every
+# sidebar facet is one, so the facets and the load-time cast share one list.
+CATEGORY_COLUMNS = FACET_COLUMNS
+
+
+def count_values(series: pd.Series, blank_label: str | None = "NA") -> pd.Series:
+    """
+    value_counts with blank values relabelled to ``blank_label`` (dropped when None).
+
+    Safe for categorical columns, where ``.replace("", label)`` would raise, and
+    keeps plain value_counts ordering (count desc, ties by first appearance).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # One bincount over the codes; np.unique's first positions give the
+        # first-appearance order that unique() would.
+        codes = series.cat.codes.to_numpy()
+        codes = codes[codes >= 0]
+        used, first = np.unique(codes, return_index=True)
+        used = used[np.argsort(first, kind="stable")]
+        labels = series.cat.categories.astype(str)[used].tolist()
+        values = np.bincount(codes, minlength=len(series.cat.categories))[used].tolist()
+    else:
+        order = [str(value) for value in series.unique()]
+        counts = series.value_counts(sort=False)
+        counts.index = counts.index.astype(str)
+        counts = counts.reindex(order).dropna().astype("int64")
+        labels, values = counts.index.tolist(), counts.tolist()
+    # Only a handful of distinct values: merge and sort them in plain Python
+    # rather than paying for a pandas groupby and sort_values.
+    merged: dict[str, int] = {}
+    for label, count in zip(labels, values):
+        if label == "":
+            if blank_label is None:
+                continue
+            label = blank_label
+        merged[label] = merged.get(label, 0) + count
+    ordered = sorted(merged.items(), key=lambda item: -item[1])
+    return pd.Series(
+        [count for _, count in ordered],
+        index=pd.Index([label for label, _ in ordered], dtype="str"),
+        dtype="int64",
+        name="count",
     )
 
-    return (
-        display_src.sort_values("nct_id", kind="stable")
-        [
-            [
-                "nct_id",
-                "nct_ref_id",
-                "source",
-                "trial_link",
-                "title",
-                "study_type",
-                "study_design",
-                "phase",
-                "status",
-                "sponsor",
-                "therapeutic_class",
-                "admission_date",
-                "last_update_date",
-                "primary_completion_date",
-                "has_results",
-                "results_last_update",
-                "pubmed_links",
-                "publication_date",
-                "publication_lag_days",
-                "publication_count",
-                "publication_match_methods",
-                "evidence_strength",
-                "dead_end",
-                "conditions",
-                "interventions",
-                "intervention_types",
-                "primary_outcomes",
-                "secondary_outcomes",
-                "inclusion_criteria",
-                "exclusion_criteria",
-                "locations",
-                "brief_summary",
-                "detailed_description",
-                "focus_tags",
-                "pdac_match_reason",
-            ]
-        ]
-        .copy()
-        .rename(
-            columns={
-                "nct_id": "Trial ID",
-                "nct_ref_id": "NCT ID",
-                "source": "Source",
-                "trial_link": "Trial Link",
-                "title": "Title",
-                "study_type": "Study Type",
-                "study_design": "Study Design",
-                "phase": "Phase",
-                "status": "Status",
-                "sponsor": "Sponsor",
-                "therapeutic_class": "Therapeutic Class",
-                "admission_date": "Admission Date",
-                "last_update_date": "Last Update",
-                "primary_completion_date": "Primary Completion",
-                "has_results": "Results",
-                "results_last_update": "Results Update",
-                "pubmed_links": "Paper Link",
-                "publication_date": "Publication Date",
-                "publication_lag_days": "Publication Lag (days)",
-                "publication_count": "Publication Count",
-                "publication_match_methods": "Publication Match Methods",
-                "evidence_strength": "Evidence Strength",
-                "dead_end": "Dead End",
-                "conditions": "Conditions",
-                "interventions": "Interventions",
-                "intervention_types": "Intervention Types",
-                "primary_outcomes": "Primary Outcomes",
-                "secondary_outcomes": "Secondary Outcomes",
-                "inclusion_criteria": "Inclusion Criteria",
-                "exclusion_criteria": "Exclusion Criteria",
-                "locations": "Locations",
-                "brief_summary": "Brief Summary",
-                "detailed_description": "Detailed Description",
-                "focus_tags": "Tags",
-                "pdac_match_reason": "Match Reason",
-            }
-        )
+
+# Comma-separated multi-value columns filtered by membership.
+MULTI_VALUE_COLUMNS = ["intervention_types", "publication_match_methods", "focus_tags"]
+
+
+def _value_matrix(series: pd.Series) -> pd.DataFrame:
+    normalized = series.astype(str).str.strip().str.replace(r"\s*,\s*", ",", regex=True)
+    matrix = normalized.str.get_dummies(sep=",", dtype=bool)
+    return matrix.drop(columns=[""], errors="ignore")
+
+
+def build_value_matrices(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """
+    One boolean column per distinct comma-separated value of each
+    multi-value column, so membership filters are vectorised row reductions.
+    """
+    return {col: _value_matrix(df[col]) for col in MULTI_VALUE_COLUMNS}
+
+
+def _matrix_values(matrix: pd.DataFrame, drop_na: bool = False) -> list[str]:
+    return sorted(col for col in matrix.columns if not (drop_na and col == "NA"))
+
+
+def year_series(series: pd.Series) -> pd.Series:
+    """
+    Leading four-digit year of each date string, or "" when there is none.
+    """
+    years = series.astype(str).str.strip().str.slice(0, 4)
+    return years.where(years.str.fullmatch(r"\d{4}"), "")
+
+
+def _year_unique(years: pd.Series) -> list[str]:
+    return sorted(x for x in years.unique().tolist() if x)
+
+
+def build_facets(df: pd.DataFrame, value_matrices: dict[str, pd.DataFrame]) -> dict[str, list[str]]:
+    """
+    Sorted sidebar filter options, computed once per dataset load.
+    """
+    facets = {
+        col: sorted(x for x in df[col].unique().tolist() if x)
+        for col in FACET_COLUMNS
+    }
+    facets["intervention_types"] = _matrix_values(value_matrices["intervention_types"], drop_na=True)
+    facets["publication_match_methods"] = _matrix_values(
+        value_matrices["publication_match_methods"], drop_na=True
     )
+    facets["focus_tags"] = _matrix_values(value_matrices["focus_tags"])
+    for date_col, year_col in YEAR_COLUMNS.items():
+        years = df[year_col] if year_col in df.columns else year_series(df[date_col])
+        facets[year_col] = _year_unique(years)
+    return facets
+
+
+# Dashboard load: one row per trial with its details row and full-match
+# publication summary. The details join is a primary-key lookup.
+TRIALS_QUERY = """
+SELECT
+    c.nct_id,
+    c.source,
+    c.secondary_id,
+    c.trial_link,
+    c.title,
+    c.study_type,
+    c.study_design,
+    c.phase,
+    c.status,
+    c.sponsor,
+    c.admission_date,
+    c.last_update_date,
+    c.primary_completion_date,
+    c.has_results,
+    c.results_last_update,
+    c.pubmed_links,
+    c.publication_date,
+    c.publication_lag_days,
+    COALESCE(pub.publication_count, 0) AS publication_count,
+    COALESCE(pub.match_methods, 'NA') AS publication_match_methods,
+    c.evidence_strength,
+    c.dead_end,
+    c.intervention_types,
+    c.therapeutic_class,
+    c.focus_tags,
+    c.pdac_match_reason,
+    d.conditions,
+    d.interventions,
+    d.primary_outcomes,
+    d.secondary_outcomes,
+    d.inclusion_criteria,
+    d.exclusion_criteria,
+    d.locations,
+    d.brief_summary,
+    d.detailed_description
+FROM clinical_trials c
+LEFT JOIN clinical_trial_details d ON d.nct_id = c.nct_id
+LEFT JOIN (
+    SELECT
+        nct_id,
+        COUNT(*) AS publication_count,
+        GROUP_CONCAT(DISTINCT match_method) AS match_methods
+    FROM trial_publications
+    WHERE LOWER(COALESCE(is_full_match, 'yes')) = 'yes'
+    GROUP BY nct_id
+) pub ON pub.nct_id = c.nct_id
+ORDER BY c.nct_id
+"""
+
+# Fallback for databases created before the details/publications schema.
+LEGACY_TRIALS_QUERY = """
+SELECT
+    c.nct_id,
+    c.source,
+    c.secondary_id,
+    c.trial_link,
+    c.title,
+    c.study_type,
+    c.study_design,
+    c.phase,
+    c.status,
+    c.sponsor,
+    c.admission_date,
+    c.last_update_date,
+    c.has_results,
+    c.results_last_update,
+    c.intervention_types,
+    c.therapeutic_class,
+    c.focus_tags,
+    c.pdac_match_reason,
+    d.conditions,
+    d.interventions,
+    d.primary_outcomes,
+    d.secondary_outcomes,
+    d.inclusion_criteria,
+    d.exclusion_criteria,
+    d.locations,
+    d.brief_summary,
+    d.detailed_description
+FROM clinical_trials c
+LEFT JOIN clinical_trial_details d ON d.nct_id = c.nct_id
+ORDER BY c.nct_id
+"""
+
 
+def _connect_readonly() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_PATH)
+    # The dashboard never writes; memory-map the file so page reads skip the
+    # read() syscall and copy.
+    conn.execute("PRAGMA query_only = ON")
+    conn.execute("PRAGMA mmap_size = 268435456")
+    return conn
+
+
+def db_version() -> tuple[int, ...]:
+    """
+    (mtime_ns, size) of the DB file and of its WAL, () when there is no DB.
 
-@st.cache_data(show_spinner=False)
-def load_trials(cache_buster: float = 0.0) -> pd.DataFrame:
+    The store runs in WAL mode: commits land in the -wal file and the main
+    file only changes at checkpoint, so its mtime alone misses new rows.
+    """
+    if not DB_PATH.exists():
+        return ()
+    version = []
+    for path in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal")):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            version += [0, 0]
+        else:
+            version += [stat.st_mtime_ns, stat.st_size]
+    return tuple(version)
+
+
+# Persisted to Streamlit's on-disk cache so a restarted app reuses the parsed
+# frame; callers pass db_version(), so any commit invalidates it.
+@st.cache_data(persist="disk", max_entries=4, show_spinner=False)
+def load_trials(
+    cache_buster: tuple[int, ...] = (),
+) -> tuple[pd.DataFrame, dict[str, list[str]], dict[str, pd.DataFrame]]:
     _ = cache_buster
     if not DB_PATH.exists():
-        return pd.DataFrame()
+        return pd.DataFrame(), {}, {}
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = _connect_readonly()
+    # Closed as soon as the frame is read: a connection held open would
+    # stop ingest's checkpoint from folding the WAL back into the main file.
     try:
         try:
-            df = pd.read_sql_query(
-                """
-                SELECT
-                    c.nct_id,
-                    c.source,
-                    c.secondary_id,
-                    c.trial_link,
-                    c.title,
-                    c.study_type,
-                    c.study_design,
-                    c.phase,
-                    c.status,
-                    c.sponsor,
-                    c.admission_date,
-                    c.last_update_date,
-                    c.primary_completion_date,
-                    c.has_results,
-                    c.results_last_update,
-                    c.pubmed_links,
-                    c.publication_date,
-                    c.publication_lag_days,
-                    COALESCE(pub.publication_count, 0) AS publication_count,
-                    COALESCE(pub.match_methods, 'NA') AS publication_match_methods,
-                    c.evidence_strength,
-                    c.dead_end,
-                    c.intervention_types,
-                    c.therapeutic_class,
-                    c.focus_tags,
-                    c.pdac_match_reason,
-                    d.conditions,
-                    d.interventions,
-                    d.primary_outcomes,
-                    d.secondary_outcomes,
-                    d.inclusion_criteria,
-                    d.exclusion_criteria,
-                    d.locations,
-                    d.brief_summary,
-                    d.detailed_description
-                FROM clinical_trials c
-                LEFT JOIN clinical_trial_details d ON d.nct_id = c.nct_id
-                LEFT JOIN (
-                    SELECT
-                        nct_id,
-                        COUNT(*) AS publication_count,
-                        GROUP_CONCAT(DISTINCT match_method) AS match_methods
-                    FROM trial_publications
-                    WHERE LOWER(COALESCE(is_full_match, 'yes')) = 'yes'
-                    GROUP BY nct_id
-                ) pub ON pub.nct_id = c.nct_id
-                ORDER BY c.nct_id
-                """,
-                conn,
-            )
+            df = pd.read_sql_query(TRIALS_QUERY, conn)
         except Exception as exc:
             if not any(
                 token in str(exc).lower()
@@ -282,42 +500,7 @@ def load_trials(cache_buster: float = 0.0) -> pd.DataFrame:
                 )
             ):
                 raise
-            df = pd.read_sql_query(
-                """
-                SELECT
-                    c.nct_id,
-                    c.source,
-                    c.secondary_id,
-                    c.trial_link,
-                    c.title,
-                    c.study_type,
-                    c.study_design,
-                    c.phase,
-                    c.status,
-                    c.sponsor,
-                    c.admission_date,
-                    c.last_update_date,
-                    c.has_results,
-                    c.results_last_update,
-                    c.intervention_types,
-                    c.therapeutic_class,
-                    c.focus_tags,
-                    c.pdac_match_reason,
-                    d.conditions,
-                    d.interventions,
-                    d.primary_outcomes,
-                    d.secondary_outcomes,
-                    d.inclusion_criteria,
-                    d.exclusion_criteria,
-                    d.locations,
-                    d.brief_summary,
-                    d.detailed_description
-                FROM clinical_trials c
-                LEFT JOIN clinical_trial_details d ON d.nct_id = c.nct_id
-                ORDER BY c.nct_id
-                """,
-                conn,
-            )
+            df = pd.read_sql_query(LEGACY_TRIALS_QUERY, conn)
             df["pubmed_links"] = ""
             df["primary_completion_date"] = ""
             df["publication_date"] = ""
@@ -370,185 +553,229 @@ def load_trials(cache_buster: float = 0.0) -> pd.DataFrame:
         if col not in df.columns:
             df[col] = ""
 
-    # Backfill has_results when source does not explicitly provide it.
-    df["has_results"] = df["has_results"].astype(str)
-    inferred = (
-        (df["has_results"].str.strip() == "")
-        & (df["results_last_update"].astype(str).str.strip() != "")
-    )
-    df.loc[inferred, "has_results"] = "yes"
-    df.loc[df["has_results"].str.strip() == "", "has_results"] = "no"
     df["pubmed_links"] = df["pubmed_links"].fillna("").astype(str).str.strip()
     df.loc[df["pubmed_links"] == "", "pubmed_links"] = "NA"
-    df.loc[
-        (df["pubmed_links"] != "NA")
-        & (~df["has_results"].str.strip().str.lower().eq("yes")),
-        "has_results",
-    ] = "yes"
+    # Backfill has_results when source does not explicitly provide it, and
+    # mark trials with a linked paper as having results. Each string column
+    # is normalised once into a boolean mask.
+    has_results = df["has_results"].astype(str)
+    normalized = has_results.str.strip()
+    blank = normalized.eq("").to_numpy()
+    results_updated = df["results_last_update"].astype(str).str.strip().ne("").to_numpy()
+    is_yes = normalized.str.lower().eq("yes").to_numpy()
+    has_pubmed = df["pubmed_links"].ne("NA").to_numpy()
+    df["has_results"] = (
+        has_results.mask(blank, "no")
+        .mask(blank & results_updated, "yes")
+        .mask(has_pubmed & ~is_yes, "yes")
+    )
 
     df["source"] = df["source"].fillna("").astype(str).str.strip().str.lower()
-    df.loc[df["source"] == "", "source"] = df["nct_id"].apply(
-        lambda value: "clinicaltrials.gov" if str(value).startswith("NCT") else "ctis"
+    nct_id = df["nct_id"].astype(str)
+    is_nct = nct_id.str.startswith("NCT")
+    df["source"] = df["source"].mask(
+        df["source"].eq(""),
+        pd.Series("ctis", index=df.index).mask(is_nct, "clinicaltrials.gov"),
     )
     df["secondary_id"] = df["secondary_id"].fillna("").astype(str).str.strip()
     df["trial_link"] = df["trial_link"].fillna("").astype(str).str.strip()
     missing_trial_link = df["trial_link"].eq("") | df["trial_link"].str.upper().eq("NA")
-    df.loc[
-        missing_trial_link & (df["nct_id"].astype(str).str.startswith("NCT")),
-        "trial_link",
-    ] = df["nct_id"].apply(lambda value: f"https://clinicaltrials.gov/study/{value}")
-    df.loc[
-        missing_trial_link
-        & (df["source"].astype(str).str.lower() == "euctr"),
-        "trial_link",
-    ] = df["nct_id"].apply(
-        lambda value: f"https://www.clinicaltrialsregister.eu/ctr-search/search?query=eudract_number:{value}"
-    )
-    df.loc[
-        missing_trial_link
-        & (~df["nct_id"].astype(str).str.startswith("NCT"))
-        & (df["source"].astype(str).str.lower() != "euctr"),
-        "trial_link",
-    ] = df["nct_id"].apply(
-        lambda value: f"https://euclinicaltrials.eu/search-for-clinical-trials/?lang=en&EUCT={value}"
+    # Registry link from the trial id; EUCTR wins over the NCT prefix.
+    fallback_link = (
+        ("https://euclinicaltrials.eu/search-for-clinical-trials/?lang=en&EUCT=" + nct_id)
+        .mask(is_nct, "https://clinicaltrials.gov/study/" + nct_id)
+        .mask(
+            df["source"].eq("euctr"),
+            "https://www.clinicaltrialsregister.eu/ctr-search/search?query=eudract_number:" + nct_id,
+        )
     )
+    df["trial_link"] = df["trial_link"].mask(missing_trial_link, fallback_link)
     df["publication_count"] = pd.to_numeric(df["publication_count"], errors="coerce").fillna(0).astype(int)
     df["publication_match_methods"] = (
         df["publication_match_methods"].fillna("").astype(str).str.strip()
     )
     df.loc[df["publication_match_methods"] == "", "publication_match_methods"] = "NA"
 
-    df = df[expected_cols]
-    return df.fillna("")
+    df = df[expected_cols].fillna("")
+    # Only the source columns are searchable; the hidden helper columns
+    # added below must not match query terms.
+    search_text = build_search_text(df)
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype("category")
+    for date_col, year_col in YEAR_COLUMNS.items():
+        df[year_col] = year_series(df[date_col])
+    df["nct_ref_id"] = nct_ref_ids(df)
+    value_matrices = build_value_matrices(df)
+    facets = build_facets(df, value_matrices)
+    df[SEARCH_TEXT_COLUMN] = search_text
+    return df, facets, value_matrices
 
 
-def apply_filters(df: pd.DataFrame) -> pd.DataFrame:
-    st.sidebar.header("Quick filters")
-    st.sidebar.caption("Fast, convenient filters (you can also filter directly in the table).")
-    query = st.session_state.get("global_query", "")
+LOADED_TRIALS_KEY = "_loaded_trials"
 
-    class_options = sorted([x for x in df["therapeutic_class"].unique() if x])
-    selected_classes = st.sidebar.multiselect("Therapeutic class", class_options)
 
-    design_options = sorted([x for x in df["study_design"].unique() if x])
-    selected_designs = st.sidebar.multiselect("Study design", design_options)
+def _session_trials(
+    version: tuple[int, ...],
+) -> tuple[pd.DataFrame, dict[str, list[str]], dict[str, pd.DataFrame]]:
+    """
+    load_trials, held in session state while db_version() is unchanged.
 
-    type_options = sorted([x for x in df["study_type"].unique() if x])
-    selected_types = st.sidebar.multiselect("Study type", type_options)
+    A cache_data hit still hashes the arguments and unpickles a fresh copy
+    of the frame and matrices; reruns from widget changes reuse the
+    session's copy instead.
+    """
+    loaded = st.session_state.get(LOADED_TRIALS_KEY)
+    if loaded is None or loaded[0] != version:
+        loaded = (version, load_trials(version))
+        st.session_state[LOADED_TRIALS_KEY] = loaded
+    return loaded[1]
 
-    phase_options = sorted([x for x in df["phase"].unique() if x])
-    selected_phases = st.sidebar.multiselect("Phase", phase_options)
 
-    status_options = sorted([x for x in df["status"].unique() if x])
-    selected_statuses = st.sidebar.multiselect("Status", status_options)
+def _any_value_mask(matrix: pd.DataFrame, selected: list[str]) -> np.ndarray:
+    present = [value for value in selected if value in matrix.columns]
+    if not present:
+        return np.zeros(len(matrix), dtype=bool)
+    return matrix[present].to_numpy().any(axis=1)
 
-    sponsor_options = sorted([x for x in df["sponsor"].unique() if x])
-    selected_sponsors = st.sidebar.multiselect("Sponsor", sponsor_options)
 
-    source_options = sorted([x for x in df["source"].unique() if x])
-    selected_sources = st.sidebar.multiselect("Origin", source_options)
+def _all_values_mask(matrix: pd.DataFrame, selected: list[str]) -> np.ndarray:
+    if any(value not in matrix.columns for value in selected):
+        return np.zeros(len(matrix), dtype=bool)
+    return matrix[selected].to_numpy().all(axis=1)
 
-    intervention_type_options = sorted(
-        {
-            item
-            for raw in df["intervention_types"].tolist()
-            for item in split_csv_values(raw)
-        }
-    )
+
+QUERY_MASK_CACHE_KEY = "_query_mask_cache"
+QUERY_MASK_CACHE_SIZE = 8
+FILTERED_CACHE_KEY = "_filtered_cache"
+DISPLAY_CACHE_KEY = "_display_cache"
+
+
+def _cached_query_mask(df: pd.DataFrame, query: str, dataset_key) -> np.ndarray:
+    """
+    _build_query_mask memoised in session state, so reruns triggered by other
+    widgets do not rescan the search text. ``dataset_key`` identifies the
+    loaded dataset (its db_version()); None disables the cache.
+    """
+    if dataset_key is None:
+        return _build_query_mask(df, query).to_numpy()
+    cache = st.session_state.setdefault(QUERY_MASK_CACHE_KEY, {})
+    key = (query, dataset_key, len(df))
+    mask = cache.pop(key, None)
+    if mask is None:
+        mask = _build_query_mask(df, query).to_numpy()
+    cache[key] = mask  # re-insert as most recently used
+    while len(cache) > QUERY_MASK_CACHE_SIZE:
+        del cache[next(iter(cache))]
+    return mask
+
+
+def apply_filters(
+    df: pd.DataFrame,
+    facets: dict[str, list[str]],
+    value_matrices: dict[str, pd.DataFrame],
+    dataset_key=None,
+) -> pd.DataFrame:
+    st.sidebar.header("Quick filters")
+    st.sidebar.caption("Fast, convenient filters (you can also filter directly in the table).")
+    query = st.session_state.get("global_query", "")
+
+    selected_classes = st.sidebar.multiselect("Therapeutic class", facets["therapeutic_class"])
+    selected_designs = st.sidebar.multiselect("Study design", facets["study_design"])
+    selected_types = st.sidebar.multiselect("Study type", facets["study_type"])
+    selected_phases = st.sidebar.multiselect("Phase", facets["phase"])
+    selected_statuses = st.sidebar.multiselect("Status", facets["status"])
+    selected_sponsors = st.sidebar.multiselect("Sponsor", facets["sponsor"])
+    selected_sources = st.sidebar.multiselect("Origin", facets["source"])
     selected_intervention_types = st.sidebar.multiselect(
         "Intervention type",
-        intervention_type_options,
+        facets["intervention_types"],
     )
-
-    results_options = sorted([x for x in df["has_results"].unique() if x])
-    selected_results = st.sidebar.multiselect("Results", results_options)
+    selected_results = st.sidebar.multiselect("Results", facets["has_results"])
 
     publication_presence = st.sidebar.multiselect(
         "Publication index",
         ["yes", "no"],
     )
 
-    publication_method_options = sorted(
-        {
-            item
-            for raw in df["publication_match_methods"].tolist()
-            for item in split_csv_values(raw)
-        }
-    )
     selected_publication_methods = st.sidebar.multiselect(
         "Publication match method",
-        publication_method_options,
+        facets["publication_match_methods"],
     )
-
-    evidence_options = sorted([x for x in df["evidence_strength"].unique() if x])
-    selected_evidence = st.sidebar.multiselect("Evidence strength", evidence_options)
-
-    dead_end_options = sorted([x for x in df["dead_end"].unique() if x])
-    selected_dead_end = st.sidebar.multiselect("Dead end", dead_end_options)
-
-    admission_years = sorted({_year_from_date(x) for x in df["admission_date"] if _year_from_date(x)})
-    selected_admission_years = st.sidebar.multiselect("Admission year", admission_years)
-
-    update_years = sorted({_year_from_date(x) for x in df["last_update_date"] if _year_from_date(x)})
-    selected_update_years = st.sidebar.multiselect("Last update year", update_years)
-
-    all_tags = sorted({tag for tags in df["focus_tags"] for tag in split_tags(tags)})
-    selected_tags = st.sidebar.multiselect("Focus tags", all_tags)
-
-    out = df.copy()
-    if query:
-        out = out[_build_query_mask(out, query)]
-    if selected_classes:
-        out = out[out["therapeutic_class"].isin(selected_classes)]
-    if selected_designs:
-        out = out[out["study_design"].isin(selected_designs)]
-    if selected_types:
-        out = out[out["study_type"].isin(selected_types)]
-    if selected_phases:
-        out = out[out["phase"].isin(selected_phases)]
-    if selected_statuses:
-        out = out[out["status"].isin(selected_statuses)]
-    if selected_sponsors:
-        out = out[out["sponsor"].isin(selected_sponsors)]
-    if selected_sources:
-        out = out[out["source"].isin(selected_sources)]
-    if selected_intervention_types:
-        selected_set = set(selected_intervention_types)
-        out = out[
-            out["intervention_types"].apply(
-                lambda raw: bool(selected_set.intersection(split_csv_values(raw)))
-            )
-        ]
-    if selected_results:
-        out = out[out["has_results"].isin(selected_results)]
-    if publication_presence:
-        wants_yes = "yes" in publication_presence
-        wants_no = "no" in publication_presence
-        if wants_yes and not wants_no:
-            out = out[pd.to_numeric(out["publication_count"], errors="coerce").fillna(0) > 0]
-        elif wants_no and not wants_yes:
-            out = out[pd.to_numeric(out["publication_count"], errors="coerce").fillna(0) <= 0]
-    if selected_publication_methods:
-        selected_set = set(selected_publication_methods)
-        out = out[
-            out["publication_match_methods"].apply(
-                lambda raw: bool(selected_set.intersection(split_csv_values(raw)))
+    selected_evidence = st.sidebar.multiselect("Evidence strength", facets["evidence_strength"])
+    selected_dead_end = st.sidebar.multiselect("Dead end", facets["dead_end"])
+    selected_admission_years = st.sidebar.multiselect("Admission year", facets["admission_year"])
+    selected_update_years = st.sidebar.multiselect("Last update year", facets["update_year"])
+    selected_tags = st.sidebar.multiselect("Focus tags", facets["focus_tags"])
+
+    filter_key = (
+        dataset_key,
+        query,
+        *(
+            tuple(values)
+            for values in (
+                selected_classes,
+                selected_designs,
+                selected_types,
+                selected_phases,
+                selected_statuses,
+                selected_sponsors,
+                selected_sources,
+                selected_intervention_types,
+                selected_results,
+                publication_presence,
+                selected_publication_methods,
+                selected_evidence,
+                selected_dead_end,
+                selected_admission_years,
+                selected_update_years,
+                selected_tags,
             )
-        ]
-    if selected_evidence:
-        out = out[out["evidence_strength"].isin(selected_evidence)]
-    if selected_dead_end:
-        out = out[out["dead_end"].isin(selected_dead_end)]
-    if selected_admission_years:
-        out = out[out["admission_date"].apply(lambda x: _year_from_date(x) in selected_admission_years)]
-    if selected_update_years:
-        out = out[out["last_update_date"].apply(lambda x: _year_from_date(x) in selected_update_years)]
-    if selected_tags:
-        out = out[
-            out["focus_tags"].apply(
-                lambda tags: all(tag in split_tags(tags) for tag in selected_tags)
-            )
-        ]
+        ),
+    )
+    cached = st.session_state.get(FILTERED_CACHE_KEY)
+    if dataset_key is not None and cached is not None and cached[0] == filter_key:
+        # Rerun from a widget outside the filters: reuse the last result.
+        out = cached[1]
+    else:
+        # AND every active filter into one row mask and slice the frame once,
+        # instead of materialising an intermediate frame per filter.
+        mask = np.ones(len(df), dtype=bool)
+        if query:
+            mask &= _cached_query_mask(df, query, dataset_key)
+        for col, selected in (
+            ("therapeutic_class", selected_classes),
+            ("study_design", selected_designs),
+            ("study_type", selected_types),
+            ("phase", selected_phases),
+            ("status", selected_statuses),
+            ("sponsor", selected_sponsors),
+            ("source", selected_sources),
+            ("has_results", selected_results),
+            ("evidence_strength", selected_evidence),
+            ("dead_end", selected_dead_end),
+            ("admission_year", selected_admission_years),
+            ("update_year", selected_update_years),
+        ):
+            if selected:
+                mask &= df[col].isin(selected).to_numpy()
+        if selected_intervention_types:
+            mask &= _any_value_mask(value_matrices["intervention_types"], selected_intervention_types)
+        if publication_presence:
+            wants_yes = "yes" in publication_presence
+            wants_no = "no" in publication_presence
+            has_publications = pd.to_numeric(df["publication_count"], errors="coerce").fillna(0).to_numpy() > 0
+            if wants_yes and not wants_no:
+                mask &= has_publications
+            elif wants_no and not wants_yes:
+                mask &= ~has_publications
+        if selected_publication_methods:
+            mask &= _any_value_mask(value_matrices["publication_match_methods"], selected_publication_methods)
+        if selected_tags:
+            mask &= _all_values_mask(value_matrices["focus_tags"], selected_tags)
+        # No active filter: hand back the frame itself rather than a full copy.
+        out = df if mask.all() else df.iloc[np.flatnonzero(mask)]
+        if dataset_key is not None:
+            st.session_state[FILTERED_CACHE_KEY] = (filter_key, out)
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("<div style='height:0.35rem;'></div>", unsafe_allow_html=True)
@@ -563,6 +790,43 @@ def apply_filters(df: pd.DataFrame) -> pd.DataFrame:
     return out
 
 
+def count_frame(
+    series: pd.Series, name: str, blank_label: str | None = "NA", top: int | None = None
+) -> pd.DataFrame:
+    """count_values as a two-column (name, count) frame for bar charts."""
+    counts = count_values(series, blank_label)
+    if top is not None:
+        counts = counts.head(top)
+    return pd.DataFrame({name: counts.index, "count": counts.to_numpy()})
+
+
+def indicator_count_frame(
+    matrix: pd.DataFrame, index: pd.Index, name: str, top: int | None = None
+) -> pd.DataFrame:
+    """
+    Per-item counts over the rows in ``index``, summed from a precomputed
+    indicator matrix (see build_value_matrices); "NA" items are dropped.
+    """
+    values = matrix.to_numpy()
+    if len(index) != len(matrix):
+        values = values[matrix.index.get_indexer(index)]
+    counts = pd.Series(values.sum(axis=0), index=matrix.columns)
+    counts = counts.drop("NA", errors="ignore")
+    counts = counts[counts > 0].sort_values(ascending=False, kind="stable")
+    if counts.empty:
+        return pd.DataFrame({name: ["NA"], "count": [0]})
+    if top is not None:
+        counts = counts.head(top)
+    return pd.DataFrame({name: counts.index, "count": counts.to_numpy()})
+
+
+def _nonblank_distinct(series: pd.Series) -> int:
+    # On categoricals value_counts is a bincount over the codes, with no
+    # per-row string work.
+    counts = series.value_counts(sort=False)
+    return int(((counts > 0) & (counts.index.astype(str) != "")).sum())
+
+
 def metrics_row(total_df: pd.DataFrame, filtered_df: pd.DataFrame):
     c1, c2, c3, c4, c5, c6 = st.columns(6)
     with c1:
@@ -578,35 +842,32 @@ def metrics_row(total_df: pd.DataFrame, filtered_df: pd.DataFrame):
             unsafe_allow_html=True,
         )
     with c3:
-        statuses = filtered_df["status"].replace("", pd.NA).dropna().nunique()
+        statuses = _nonblank_distinct(filtered_df["status"])
         st.markdown(
             f'<div class="metric-card"><div class="metric-label">Statuses</div>'
             f'<div class="metric-value">{statuses}</div></div>',
             unsafe_allow_html=True,
         )
     with c4:
-        sponsors = filtered_df["sponsor"].replace("", pd.NA).dropna().nunique()
+        sponsors = _nonblank_distinct(filtered_df["sponsor"])
         st.markdown(
             f'<div class="metric-card"><div class="metric-label">Sponsors</div>'
             f'<div class="metric-value">{sponsors}</div></div>',
             unsafe_allow_html=True,
         )
     with c5:
-        with_results = (
-            filtered_df["has_results"]
-            .astype(str)
-            .str.strip()
-            .str.lower()
-            .eq("yes")
-            .sum()
-        )
+        # Normalise the few category labels rather than every row.
+        result_counts = filtered_df["has_results"].value_counts(sort=False)
+        with_results = result_counts[
+            result_counts.index.astype(str).str.strip().str.lower() == "yes"
+        ].sum()
         st.markdown(
             f'<div class="metric-card"><div class="metric-label">With Results</div>'
             f'<div class="metric-value">{int(with_results):,}</div></div>',
             unsafe_allow_html=True,
         )
     with c6:
-        intervention_types = filtered_df["intervention_types"].replace("", pd.NA).dropna().nunique()
+        intervention_types = _nonblank_distinct(filtered_df["intervention_types"])
         st.markdown(
             f'<div class="metric-card"><div class="metric-label">Intervention Types</div>'
             f'<div class="metric-value">{intervention_types}</div></div>',
@@ -614,6 +875,344 @@ def metrics_row(total_df: pd.DataFrame, filtered_df: pd.DataFrame):
         )
 
 
+def _csv_bytes(df: pd.DataFrame) -> bytes:
+    # Arrow's CSV writer is an order of magnitude faster than to_csv. It
+    # quotes every string field, which any CSV reader accepts. Mixed object
+    # columns (publication_lag_days) are stringified so Arrow can type them.
+    object_cols = df.columns[df.dtypes == object]
+    table = pa.Table.from_pandas(df.astype({col: str for col in object_cols}), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    pacsv.write_csv(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def _explorer_display_df(
+    filtered: pd.DataFrame, full_display_df: pd.DataFrame, selected_columns: list[str]
+) -> pd.DataFrame:
+    """
+    The explorer's visible columns, reused from session state while the
+    filtered frame (the same object across reruns when no filter changed,
+    see apply_filters) and the column picks are unchanged.
+    """
+    columns = tuple(selected_columns)
+    cached = st.session_state.get(DISPLAY_CACHE_KEY)
+    if cached is not None and cached[0] is filtered and cached[1] == columns:
+        return cached[2]
+    display_df = full_display_df[list(columns) + ["Trial Link"]].copy()
+    if "Paper Link" in display_df.columns:
+        display_df["Paper Link"] = first_pubmed_links(display_df["Paper Link"])
+    st.session_state[DISPLAY_CACHE_KEY] = (filtered, columns, display_df)
+    return display_df
+
+
+GRID_CONFIG_CACHE_SIZE = 16
+_GRID_CONFIGS: dict[tuple, tuple[dict, dict]] = {}
+
+
+def _grid_config(display_df: pd.DataFrame, is_dark: bool, page_size: int) -> tuple[dict, dict]:
+    """
+    AgGrid options and CSS for a column layout, built once per distinct
+    columns/dtype kinds/theme and reused across reruns. AgGrid rewrites the
+    options dict in place, so callers get a copy.
+    """
+    key = (
+        tuple(display_df.columns),
+        tuple(dtype.kind for dtype in display_df.dtypes),
+        is_dark,
+        page_size,
+    )
+    config = _GRID_CONFIGS.get(key)
+    if config is None:
+        if len(_GRID_CONFIGS) >= GRID_CONFIG_CACHE_SIZE:
+            _GRID_CONFIGS.clear()
+        config = _GRID_CONFIGS[key] = _build_grid_config(display_df.iloc[:0], is_dark, page_size)
+    grid_options, grid_css = config
+    return copy.deepcopy(grid_options), grid_css
+
+
+def _build_grid_config(display_df: pd.DataFrame, is_dark: bool, page_size: int) -> tuple[dict, dict]:
+    _, GridOptionsBuilder, JsCode = _load_aggrid()
+    gb = GridOptionsBuilder.from_dataframe(display_df)
+    gb.configure_default_column(
+        sortable=True,
+        filter=True,
+        resizable=True,
+        flex=1,
+        minWidth=115,
+        wrapText=False,
+        autoHeight=False,
+        tooltipValueGetter=JsCode(
+            """
+            function(params) {
+                return params.value == null ? "" : String(params.value);
+            }
+            """
+        ),
+        cellStyle={
+            "whiteSpace": "nowrap",
+            "overflow": "hidden",
+            "textOverflow": "ellipsis",
+        },
+    )
+    column_help = {
+        "Trial ID": "Trial identifier from the original source (opens source record).",
+        "NCT ID": "ClinicalTrials.gov NCT identifier when available (NA otherwise).",
+        "Source": "Registry source for this trial row.",
+        "Trial Link": "Canonical URL for opening the trial in its source registry.",
+        "Title": "Official brief trial title.",
+        "Study Type": "Interventional / Observational / Expanded access.",
+        "Study Design": "Normalized design classification.",
+        "Phase": "Clinical phase as reported by source.",
+        "Status": "Current recruitment/overall status.",
+        "Sponsor": "Lead sponsor organization.",
+        "Therapeutic Class": "Normalized therapy strategy class.",
+        "Admission Date": "Initial registration/posting date.",
+        "Last Update": "Latest update date reported.",
+        "Primary Completion": "Primary completion date (when available).",
+        "Results": "Whether source indicates result availability.",
+        "Results Update": "Date associated with results publication/update.",
+        "Paper Link": "First linked PubMed paper found by NCT.",
+        "Publication Date": "Earliest linked PubMed publication date (when available).",
+        "Publication Lag (days)": "Publication date minus primary completion date.",
+        "Publication Count": "Number of full-match publication records linked to this trial.",
+        "Publication Match Methods": "Methods used for full-match publication linking.",
+        "Evidence Strength": "Heuristic evidence strength based on phase, results, and timing.",
+        "Dead End": "Phase >=2, completed/terminated, no publication after 5 years.",
+        "Conditions": "Reported study conditions.",
+        "Interventions": "Interventions with type and name.",
+        "Intervention Types": "Unique intervention type(s) only.",
+        "Primary Outcomes": "Primary endpoint definitions.",
+        "Secondary Outcomes": "Secondary endpoint definitions.",
+        "Inclusion Criteria": "Eligibility inclusion text.",
+        "Exclusion Criteria": "Eligibility exclusion text.",
+        "Locations": "Sites/locations from source.",
+        "Brief Summary": "Short study description from source.",
+        "Detailed Description": "Long study description from source.",
+        "Tags": "Normalized focus tags.",
+        "Match Reason": "Why trial was matched as PDAC-relevant.",
+    }
+    for col in display_df.columns:
+        if col in column_help:
+            gb.configure_column(col, headerTooltip=column_help[col])
+    gb.configure_pagination(
+        enabled=True,
+        paginationAutoPageSize=False,
+        paginationPageSize=page_size,
+    )
+    gb.configure_column(
+        "Trial ID",
+        minWidth=130,
+        maxWidth=170,
+        pinned="left",
+        cellStyle={"color": "#2f7a66", "textDecoration": "underline", "fontWeight": 600},
+    )
+    if "Trial Link" in display_df.columns:
+        gb.configure_column("Trial Link", hide=True)
+    if "Title" in display_df.columns:
+        gb.configure_column("Title", minWidth=260, flex=2.2)
+    if "Source" in display_df.columns:
+        gb.configure_column("Source", minWidth=115, maxWidth=170)
+    if "NCT ID" in display_df.columns:
+        gb.configure_column(
+            "NCT ID",
+            minWidth=130,
+            maxWidth=180,
+            cellStyle={"color": "#2f7a66", "textDecoration": "underline", "fontWeight": 600},
+        )
+    if "Admission Date" in display_df.columns:
+        gb.configure_column("Admission Date", minWidth=125, maxWidth=170)
+    if "Last Update" in display_df.columns:
+        gb.configure_column("Last Update", minWidth=125, maxWidth=170)
+    if "Primary Completion" in display_df.columns:
+        gb.configure_column("Primary Completion", minWidth=145, maxWidth=185)
+    if "Results" in display_df.columns:
+        gb.configure_column("Results", minWidth=90, maxWidth=115)
+    if "Results Update" in display_df.columns:
+        gb.configure_column("Results Update", minWidth=130, maxWidth=180)
+    if "Paper Link" in display_df.columns:
+        gb.configure_column(
+            "Paper Link",
+            minWidth=190,
+            flex=1.35,
+            cellStyle={"color": "#2f7a66", "textDecoration": "underline"},
+        )
+    if "Publication Date" in display_df.columns:
+        gb.configure_column("Publication Date", minWidth=145, maxWidth=190)
+    if "Publication Lag (days)" in display_df.columns:
+        gb.configure_column("Publication Lag (days)", minWidth=155, maxWidth=210)
+    if "Publication Count" in display_df.columns:
+        gb.configure_column("Publication Count", minWidth=130, maxWidth=170)
+    if "Publication Match Methods" in display_df.columns:
+        gb.configure_column("Publication Match Methods", minWidth=175, maxWidth=260)
+    if "Evidence Strength" in display_df.columns:
+        gb.configure_column("Evidence Strength", minWidth=145, maxWidth=185)
+    if "Dead End" in display_df.columns:
+        gb.configure_column("Dead End", minWidth=95, maxWidth=120)
+    if "Intervention Types" in display_df.columns:
+        gb.configure_column("Intervention Types", minWidth=145, maxWidth=210)
+    if "Conditions" in display_df.columns:
+        gb.configure_column("Conditions", minWidth=200, flex=1.4)
+    if "Interventions" in display_df.columns:
+        gb.configure_column("Interventions", minWidth=220, flex=1.5)
+    if "Primary Outcomes" in display_df.columns:
+        gb.configure_column("Primary Outcomes", minWidth=230, flex=1.6)
+    if "Secondary Outcomes" in display_df.columns:
+        gb.configure_column("Secondary Outcomes", minWidth=230, flex=1.6)
+    if "Inclusion Criteria" in display_df.columns:
+        gb.configure_column("Inclusion Criteria", minWidth=240, flex=1.7)
+    if "Exclusion Criteria" in display_df.columns:
+        gb.configure_column("Exclusion Criteria", minWidth=240, flex=1.7)
+    if "Locations" in display_df.columns:
+        gb.configure_column("Locations", minWidth=210, flex=1.3)
+    if "Brief Summary" in display_df.columns:
+        gb.configure_column("Brief Summary", minWidth=240, flex=1.8)
+    if "Detailed Description" in display_df.columns:
+        gb.configure_column("Detailed Description", minWidth=240, flex=1.8)
+    if "Tags" in display_df.columns:
+        gb.configure_column("Tags", minWidth=170, flex=1.2)
+    if "Match Reason" in display_df.columns:
+        gb.configure_column("Match Reason", minWidth=150, maxWidth=230)
+    gb.configure_grid_options(
+        rowHeight=34,
+        tooltipShowDelay=100,
+        onCellClicked=JsCode(
+            """
+            function(e) {
+                if (e.colDef.field === "Trial ID" && e.value) {
+                    const rawLink = e.data && e.data["Trial Link"] ? String(e.data["Trial Link"]) : "";
+                    const links = rawLink.includes("|")
+                        ? rawLink.split("|").map(x => x.trim()).filter(Boolean)
+                        : (rawLink.trim() ? [rawLink.trim()] : []);
+                    const source = e.data && e.data["Source"] ? String(e.data["Source"]).toLowerCase() : "";
+                    let trialLink = "";
+                    // For merged rows show the non-NCT source from Trial ID, keeping NCT link in NCT ID.
+                    if (source === "clinicaltrials.gov+ctis" && links.length > 1) {
+                        trialLink = links[1];
+                    } else if (links.length > 0) {
+                        trialLink = links[0];
+                    }
+                    if (trialLink) {
+                        window.open(trialLink, "_blank");
+                    } else {
+                        const trialId = String(e.value || "");
+                        const fallback = trialId.startsWith("NCT")
+                            ? "https://clinicaltrials.gov/study/" + trialId
+                            : "https://euclinicaltrials.eu/search-for-clinical-trials/?lang=en&EUCT=" + encodeURIComponent(trialId);
+                        window.open(fallback, "_blank");
+                    }
+                }
+                if (e.colDef.field === "NCT ID" && e.value && e.value !== "NA") {
+                    window.open("https://clinicaltrials.gov/study/" + String(e.value), "_blank");
+                }
+                if (e.colDef.field === "Paper Link" && e.value && e.value !== "NA") {
+                    window.open(e.value, "_blank");
+                }
+            }
+            """
+        ),
+        onFirstDataRendered=JsCode(
+            """
+            function(params) {
+                params.api.sizeColumnsToFit();
+            }
+            """
+        ),
+        onGridSizeChanged=JsCode(
+            """
+            function(params) {
+                params.api.sizeColumnsToFit();
+            }
+            """
+        ),
+        enableCellTextSelection=True,
+        ensureDomOrder=True,
+    )
+
+    grid_css = {
+        ".ag-root-wrapper": {
+            "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
+            "border": ("1px solid #64748b !important" if is_dark else "1px solid #cbd5e1 !important"),
+            "border-radius": "6px !important",
+            "overflow": "hidden !important",
+        },
+        ".ag-root, .ag-body-viewport, .ag-center-cols-viewport": {
+            "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
+            "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
+        },
+        ".ag-header, .ag-header-viewport, .ag-header-container, .ag-pinned-left-header": {
+            "background-color": ("#020617 !important" if is_dark else "#eef2f7 !important"),
+            "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
+            "border-top": "none !important",
+        },
+        ".ag-header-row, .ag-header-cell": {
+            "border-bottom": ("3px solid #64748b !important" if is_dark else "2px solid #cbd5e1 !important"),
+            "border-top": "none !important",
+        },
+        ".ag-header-cell": {
+            "border-right": ("1px solid #64748b !important" if is_dark else "1px solid #cbd5e1 !important"),
+        },
+        ".ag-header-cell-label, .ag-header-cell-text": {
+            "font-weight": "700 !important",
+            "letter-spacing": "0.015em !important",
+            "text-transform": "none !important",
+            "color": ("#f8fafc !important" if is_dark else "#1f2937 !important"),
+        },
+        ".ag-header-cell, .ag-cell, .ag-row, .ag-row-odd, .ag-row-even": {
+            "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
+            "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
+            "border-color": ("#374151 !important" if is_dark else "#e5e7eb !important"),
+        },
+        ".ag-row-odd .ag-cell": {
+            "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
+        },
+        ".ag-row-even .ag-cell": {
+            "background-color": ("#0b1220 !important" if is_dark else "#f8fafc !important"),
+        },
+        ".ag-row-hover .ag-cell, .ag-row-hover.ag-row-even .ag-cell, .ag-row-hover.ag-row-odd .ag-cell": {
+            "background-color": ("#1f2937 !important" if is_dark else "#eef2f7 !important"),
+        },
+        ".ag-paging-panel": {
+            "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
+            "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
+            "border-top": ("1px solid #374151 !important" if is_dark else "1px solid #e5e7eb !important"),
+        },
+        ".ag-paging-panel .ag-picker-field-wrapper, .ag-paging-panel .ag-input-field-input": {
+            "background-color": ("#0f172a !important" if is_dark else "#ffffff !important"),
+            "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
+            "border": ("1px solid #374151 !important" if is_dark else "1px solid #d1d5db !important"),
+        },
+        ".ag-paging-panel .ag-picker-field-display, .ag-paging-panel .ag-picker-field-icon": {
+            "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
+        },
+        ".ag-picker-field-popup, .ag-list, .ag-select-list": {
+            "background-color": ("#0f172a !important" if is_dark else "#ffffff !important"),
+            "border": ("1px solid #374151 !important" if is_dark else "1px solid #d1d5db !important"),
+            "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
+        },
+        ".ag-picker-field-popup .ag-list-item, .ag-select-list .ag-list-item": {
+            "background-color": ("#0f172a !important" if is_dark else "#ffffff !important"),
+            "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
+        },
+        ".ag-picker-field-popup .ag-list-item:hover, .ag-select-list .ag-list-item:hover": {
+            "background-color": ("#1f2937 !important" if is_dark else "#f3f4f6 !important"),
+        },
+        ".ag-paging-panel .ag-icon, .ag-paging-panel .ag-paging-row-summary-panel, .ag-paging-panel .ag-label": {
+            "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
+        },
+        ".ag-tooltip": {
+            "background-color": ("#1f2937 !important" if is_dark else "#f8fafc !important"),
+            "color": ("#f9fafb !important" if is_dark else "#1f2937 !important"),
+            "border": ("1px solid #374151 !important" if is_dark else "1px solid #dbe4f0 !important"),
+            "border-radius": "10px !important",
+            "box-shadow": "0 8px 24px rgba(15, 23, 42, 0.12) !important",
+            "padding": "8px 10px !important",
+            "font-size": "0.83rem !important",
+            "line-height": "1.35 !important",
+        }
+    }
+    return gb.build(), grid_css
+
+
 def render_explorer(filtered: pd.DataFrame):
     theme_mode = st.session_state.get("theme_mode", "Normal")
     is_dark = theme_mode == "Dark"
@@ -662,14 +1261,13 @@ def render_explorer(filtered: pd.DataFrame):
             selected_columns = default_columns
         if "Trial ID" not in selected_columns:
             selected_columns = ["Trial ID"] + selected_columns
-        display_df = full_display_df[selected_columns + ["Trial Link"]].copy()
-        if "Paper Link" in display_df.columns:
-            display_df["Paper Link"] = display_df["Paper Link"].apply(first_pubmed_link)
+        display_df = _explorer_display_df(filtered, full_display_df, selected_columns)
         with export_col:
             st.markdown("<div style='height:1.95rem;'></div>", unsafe_allow_html=True)
             st.download_button(
                 "Export filtered CSV",
-                data=display_df.to_csv(index=False).encode("utf-8"),
+                # Serialised only when the button is clicked, not on every rerun.
+                data=partial(_csv_bytes, display_df),
                 file_name="pdac_trials_filtered.csv",
                 mime="text/csv",
                 width="stretch",
@@ -691,290 +1289,16 @@ def render_explorer(filtered: pd.DataFrame):
             )
     st.markdown("<div style='margin-bottom:-0.75rem;'></div>", unsafe_allow_html=True)
 
-    if HAS_AGGRID:
+    aggrid = _load_aggrid()
+    if aggrid:
+        AgGrid = aggrid[0]
         try:
-            gb = GridOptionsBuilder.from_dataframe(display_df)
-            gb.configure_default_column(
-                sortable=True,
-                filter=True,
-                resizable=True,
-                flex=1,
-                minWidth=115,
-                wrapText=False,
-                autoHeight=False,
-                tooltipValueGetter=JsCode(
-                    """
-                    function(params) {
-                        return params.value == null ? "" : String(params.value);
-                    }
-                    """
-                ),
-                cellStyle={
-                    "whiteSpace": "nowrap",
-                    "overflow": "hidden",
-                    "textOverflow": "ellipsis",
-                },
-            )
-            column_help = {
-                "Trial ID": "Trial identifier from the original source (opens source record).",
-                "NCT ID": "ClinicalTrials.gov NCT identifier when available (NA otherwise).",
-                "Source": "Registry source for this trial row.",
-                "Trial Link": "Canonical URL for opening the trial in its source registry.",
-                "Title": "Official brief trial title.",
-                "Study Type": "Interventional / Observational / Expanded access.",
-                "Study Design": "Normalized design classification.",
-                "Phase": "Clinical phase as reported by source.",
-                "Status": "Current recruitment/overall status.",
-                "Sponsor": "Lead sponsor organization.",
-                "Therapeutic Class": "Normalized therapy strategy class.",
-                "Admission Date": "Initial registration/posting date.",
-                "Last Update": "Latest update date reported.",
-                "Primary Completion": "Primary completion date (when available).",
-                "Results": "Whether source indicates result availability.",
-                "Results Update": "Date associated with results publication/update.",
-                "Paper Link": "First linked PubMed paper found by NCT.",
-                "Publication Date": "Earliest linked PubMed publication date (when available).",
-                "Publication Lag (days)": "Publication date minus primary completion date.",
-                "Publication Count": "Number of full-match publication records linked to this trial.",
-                "Publication Match Methods": "Methods used for full-match publication linking.",
-                "Evidence Strength": "Heuristic evidence strength based on phase, results, and timing.",
-                "Dead End": "Phase >=2, completed/terminated, no publication after 5 years.",
-                "Conditions": "Reported study conditions.",
-                "Interventions": "Interventions with type and name.",
-                "Intervention Types": "Unique intervention type(s) only.",
-                "Primary Outcomes": "Primary endpoint definitions.",
-                "Secondary Outcomes": "Secondary endpoint definitions.",
-                "Inclusion Criteria": "Eligibility inclusion text.",
-                "Exclusion Criteria": "Eligibility exclusion text.",
-                "Locations": "Sites/locations from source.",
-                "Brief Summary": "Short study description from source.",
-                "Detailed Description": "Long study description from source.",
-                "Tags": "Normalized focus tags.",
-                "Match Reason": "Why trial was matched as PDAC-relevant.",
-            }
-            for col in display_df.columns:
-                if col in column_help:
-                    gb.configure_column(col, headerTooltip=column_help[col])
-            gb.configure_pagination(
-                enabled=True,
-                paginationAutoPageSize=False,
-                paginationPageSize=page_size,
-            )
-            gb.configure_column(
-                "Trial ID",
-                minWidth=130,
-                maxWidth=170,
-                pinned="left",
-                cellStyle={"color": "#2f7a66", "textDecoration": "underline", "fontWeight": 600},
-            )
-            if "Trial Link" in display_df.columns:
-                gb.configure_column("Trial Link", hide=True)
-            if "Title" in display_df.columns:
-                gb.configure_column("Title", minWidth=260, flex=2.2)
-            if "Source" in display_df.columns:
-                gb.configure_column("Source", minWidth=115, maxWidth=170)
-            if "NCT ID" in display_df.columns:
-                gb.configure_column(
-                    "NCT ID",
-                    minWidth=130,
-                    maxWidth=180,
-                    cellStyle={"color": "#2f7a66", "textDecoration": "underline", "fontWeight": 600},
-                )
-            if "Admission Date" in display_df.columns:
-                gb.configure_column("Admission Date", minWidth=125, maxWidth=170)
-            if "Last Update" in display_df.columns:
-                gb.configure_column("Last Update", minWidth=125, maxWidth=170)
-            if "Primary Completion" in display_df.columns:
-                gb.configure_column("Primary Completion", minWidth=145, maxWidth=185)
-            if "Results" in display_df.columns:
-                gb.configure_column("Results", minWidth=90, maxWidth=115)
-            if "Results Update" in display_df.columns:
-                gb.configure_column("Results Update", minWidth=130, maxWidth=180)
-            if "Paper Link" in display_df.columns:
-                gb.configure_column(
-                    "Paper Link",
-                    minWidth=190,
-                    flex=1.35,
-                    cellStyle={"color": "#2f7a66", "textDecoration": "underline"},
-                )
-            if "Publication Date" in display_df.columns:
-                gb.configure_column("Publication Date", minWidth=145, maxWidth=190)
-            if "Publication Lag (days)" in display_df.columns:
-                gb.configure_column("Publication Lag (days)", minWidth=155, maxWidth=210)
-            if "Publication Count" in display_df.columns:
-                gb.configure_column("Publication Count", minWidth=130, maxWidth=170)
-            if "Publication Match Methods" in display_df.columns:
-                gb.configure_column("Publication Match Methods", minWidth=175, maxWidth=260)
-            if "Evidence Strength" in display_df.columns:
-                gb.configure_column("Evidence Strength", minWidth=145, maxWidth=185)
-            if "Dead End" in display_df.columns:
-                gb.configure_column("Dead End", minWidth=95, maxWidth=120)
-            if "Intervention Types" in display_df.columns:
-                gb.configure_column("Intervention Types", minWidth=145, maxWidth=210)
-            if "Conditions" in display_df.columns:
-                gb.configure_column("Conditions", minWidth=200, flex=1.4)
-            if "Interventions" in display_df.columns:
-                gb.configure_column("Interventions", minWidth=220, flex=1.5)
-            if "Primary Outcomes" in display_df.columns:
-                gb.configure_column("Primary Outcomes", minWidth=230, flex=1.6)
-            if "Secondary Outcomes" in display_df.columns:
-                gb.configure_column("Secondary Outcomes", minWidth=230, flex=1.6)
-            if "Inclusion Criteria" in display_df.columns:
-                gb.configure_column("Inclusion Criteria", minWidth=240, flex=1.7)
-            if "Exclusion Criteria" in display_df.columns:
-                gb.configure_column("Exclusion Criteria", minWidth=240, flex=1.7)
-            if "Locations" in display_df.columns:
-                gb.configure_column("Locations", minWidth=210, flex=1.3)
-            if "Brief Summary" in display_df.columns:
-                gb.configure_column("Brief Summary", minWidth=240, flex=1.8)
-            if "Detailed Description" in display_df.columns:
-                gb.configure_column("Detailed Description", minWidth=240, flex=1.8)
-            if "Tags" in display_df.columns:
-                gb.configure_column("Tags", minWidth=170, flex=1.2)
-            if "Match Reason" in display_df.columns:
-                gb.configure_column("Match Reason", minWidth=150, maxWidth=230)
-            gb.configure_grid_options(
-                rowHeight=34,
-                tooltipShowDelay=100,
-                onCellClicked=JsCode(
-                    """
-                    function(e) {
-                        if (e.colDef.field === "Trial ID" && e.value) {
-                            const rawLink = e.data && e.data["Trial Link"] ? String(e.data["Trial Link"]) : "";
-                            const links = rawLink.includes("|")
-                                ? rawLink.split("|").map(x => x.trim()).filter(Boolean)
-                                : (rawLink.trim() ? [rawLink.trim()] : []);
-                            const source = e.data && e.data["Source"] ? String(e.data["Source"]).toLowerCase() : "";
-                            let trialLink = "";
-                            // For merged rows show the non-NCT source from Trial ID, keeping NCT link in NCT ID.
-                            if (source === "clinicaltrials.gov+ctis" && links.length > 1) {
-                                trialLink = links[1];
-                            } else if (links.length > 0) {
-                                trialLink = links[0];
-                            }
-                            if (trialLink) {
-                                window.open(trialLink, "_blank");
-                            } else {
-                                const trialId = String(e.value || "");
-                                const fallback = trialId.startsWith("NCT")
-                                    ? "https://clinicaltrials.gov/study/" + trialId
-                                    : "https://euclinicaltrials.eu/search-for-clinical-trials/?lang=en&EUCT=" + encodeURIComponent(trialId);
-                                window.open(fallback, "_blank");
-                            }
-                        }
-                        if (e.colDef.field === "NCT ID" && e.value && e.value !== "NA") {
-                            window.open("https://clinicaltrials.gov/study/" + String(e.value), "_blank");
-                        }
-                        if (e.colDef.field === "Paper Link" && e.value && e.value !== "NA") {
-                            window.open(e.value, "_blank");
-                        }
-                    }
-                    """
-                ),
-                onFirstDataRendered=JsCode(
-                    """
-                    function(params) {
-                        params.api.sizeColumnsToFit();
-                    }
-                    """
-                ),
-                onGridSizeChanged=JsCode(
-                    """
-                    function(params) {
-                        params.api.sizeColumnsToFit();
-                    }
-                    """
-                ),
-                enableCellTextSelection=True,
-                ensureDomOrder=True,
-            )
-
-            grid_css = {
-                ".ag-root-wrapper": {
-                    "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
-                    "border": ("1px solid #64748b !important" if is_dark else "1px solid #cbd5e1 !important"),
-                    "border-radius": "6px !important",
-                    "overflow": "hidden !important",
-                },
-                ".ag-root, .ag-body-viewport, .ag-center-cols-viewport": {
-                    "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
-                    "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
-                },
-                ".ag-header, .ag-header-viewport, .ag-header-container, .ag-pinned-left-header": {
-                    "background-color": ("#020617 !important" if is_dark else "#eef2f7 !important"),
-                    "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
-                    "border-top": "none !important",
-                },
-                ".ag-header-row, .ag-header-cell": {
-                    "border-bottom": ("3px solid #64748b !important" if is_dark else "2px solid #cbd5e1 !important"),
-                    "border-top": "none !important",
-                },
-                ".ag-header-cell": {
-                    "border-right": ("1px solid #64748b !important" if is_dark else "1px solid #cbd5e1 !important"),
-                },
-                ".ag-header-cell-label, .ag-header-cell-text": {
-                    "font-weight": "700 !important",
-                    "letter-spacing": "0.015em !important",
-                    "text-transform": "none !important",
-                    "color": ("#f8fafc !important" if is_dark else "#1f2937 !important"),
-                },
-                ".ag-header-cell, .ag-cell, .ag-row, .ag-row-odd, .ag-row-even": {
-                    "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
-                    "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
-                    "border-color": ("#374151 !important" if is_dark else "#e5e7eb !important"),
-                },
-                ".ag-row-odd .ag-cell": {
-                    "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
-                },
-                ".ag-row-even .ag-cell": {
-                    "background-color": ("#0b1220 !important" if is_dark else "#f8fafc !important"),
-                },
-                ".ag-row-hover .ag-cell, .ag-row-hover.ag-row-even .ag-cell, .ag-row-hover.ag-row-odd .ag-cell": {
-                    "background-color": ("#1f2937 !important" if is_dark else "#eef2f7 !important"),
-                },
-                ".ag-paging-panel": {
-                    "background-color": ("#111827 !important" if is_dark else "#ffffff !important"),
-                    "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
-                    "border-top": ("1px solid #374151 !important" if is_dark else "1px solid #e5e7eb !important"),
-                },
-                ".ag-paging-panel .ag-picker-field-wrapper, .ag-paging-panel .ag-input-field-input": {
-                    "background-color": ("#0f172a !important" if is_dark else "#ffffff !important"),
-                    "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
-                    "border": ("1px solid #374151 !important" if is_dark else "1px solid #d1d5db !important"),
-                },
-                ".ag-paging-panel .ag-picker-field-display, .ag-paging-panel .ag-picker-field-icon": {
-                    "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
-                },
-                ".ag-picker-field-popup, .ag-list, .ag-select-list": {
-                    "background-color": ("#0f172a !important" if is_dark else "#ffffff !important"),
-                    "border": ("1px solid #374151 !important" if is_dark else "1px solid #d1d5db !important"),
-                    "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
-                },
-                ".ag-picker-field-popup .ag-list-item, .ag-select-list .ag-list-item": {
-                    "background-color": ("#0f172a !important" if is_dark else "#ffffff !important"),
-                    "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
-                },
-                ".ag-picker-field-popup .ag-list-item:hover, .ag-select-list .ag-list-item:hover": {
-                    "background-color": ("#1f2937 !important" if is_dark else "#f3f4f6 !important"),
-                },
-                ".ag-paging-panel .ag-icon, .ag-paging-panel .ag-paging-row-summary-panel, .ag-paging-panel .ag-label": {
-                    "color": ("#e5e7eb !important" if is_dark else "#1f2937 !important"),
-                },
-                ".ag-tooltip": {
-                    "background-color": ("#1f2937 !important" if is_dark else "#f8fafc !important"),
-                    "color": ("#f9fafb !important" if is_dark else "#1f2937 !important"),
-                    "border": ("1px solid #374151 !important" if is_dark else "1px solid #dbe4f0 !important"),
-                    "border-radius": "10px !important",
-                    "box-shadow": "0 8px 24px rgba(15, 23, 42, 0.12) !important",
-                    "padding": "8px 10px !important",
-                    "font-size": "0.83rem !important",
-                    "line-height": "1.35 !important",
-                }
-            }
-
+            grid_options, grid_css = _grid_config(display_df, is_dark, page_size)
             AgGrid(
-                display_df,
-                gridOptions=gb.build(),
+                # AgGrid adds a row-id column to the frame it is given; keep
+                # it off display_df, which the CSV export also serialises.
+                display_df.copy(deep=False),
+                gridOptions=grid_options,
                 allow_unsafe_jscode=True,
                 custom_css=grid_css,
                 update_mode="NO_UPDATE",
@@ -995,28 +1319,20 @@ def render_explorer(filtered: pd.DataFrame):
     end = min(start + page_size, total_rows)
 
     page_df = display_df.iloc[start:end].copy()
-    page_df["Trial ID"] = page_df.apply(
-        lambda row: (
-            str(row["Trial Link"]).split("|")[0].strip()
-            if row.get("Trial Link")
-            else (
-                f"https://clinicaltrials.gov/study/{row['Trial ID']}"
-                if str(row["Trial ID"]).startswith("NCT")
-                else f"https://euclinicaltrials.eu/search-for-clinical-trials/?lang=en&EUCT={row['Trial ID']}"
-            )
-        ),
-        axis=1,
+    trial_ids = page_df["Trial ID"].astype(str)
+    trial_links = page_df["Trial Link"].astype(str)
+    registry_links = ("https://clinicaltrials.gov/study/" + trial_ids).where(
+        trial_ids.str.startswith("NCT"),
+        "https://euclinicaltrials.eu/search-for-clinical-trials/?lang=en&EUCT=" + trial_ids,
     )
-    if "Trial Link" in page_df.columns:
-        page_df = page_df.drop(columns=["Trial Link"])
+    page_df["Trial ID"] = trial_links.str.split("|").str[0].str.strip().where(trial_links != "", registry_links)
+    page_df = page_df.drop(columns=["Trial Link"])
     if "NCT ID" in page_df.columns:
-        page_df["NCT ID"] = page_df["NCT ID"].apply(
-            lambda v: f"https://clinicaltrials.gov/study/{v}" if v and v != "NA" else ""
-        )
+        nct_ids = page_df["NCT ID"].astype(str)
+        page_df["NCT ID"] = ("https://clinicaltrials.gov/study/" + nct_ids).where(~nct_ids.isin(["", "NA"]), "")
     if "Paper Link" in page_df.columns:
-        page_df["Paper Link"] = page_df["Paper Link"].apply(
-            lambda link: link if link and link != "NA" else ""
-        )
+        paper_links = page_df["Paper Link"].astype(str)
+        page_df["Paper Link"] = paper_links.where(~paper_links.isin(["", "NA"]), "")
     st.caption(f"Showing rows {start + 1:,}-{end:,} of {total_rows:,}")
     column_cfg = {
         "Trial ID": st.column_config.LinkColumn("Trial ID", display_text="Open trial"),
@@ -1034,233 +1350,105 @@ def render_explorer(filtered: pd.DataFrame):
     )
 
 
-def render_analytics(filtered: pd.DataFrame):
+# (background, text, grid) chart colours, keyed by dark mode.
+CHART_COLORS = {
+    False: ("#ffffff", "#1f2937", "#e5e7eb"),
+    True: ("#0f172a", "#e5e7eb", "#334155"),
+}
+
+
+def _chart_config(text_color: str, grid: str) -> dict:
+    return {
+        "axis": {
+            "domainColor": grid,
+            "gridColor": grid,
+            "labelColor": text_color,
+            "tickColor": grid,
+            "titleColor": text_color,
+        },
+        "legend": {"labelColor": text_color, "titleColor": text_color},
+        "title": {"color": text_color},
+        "view": {"stroke": grid},
+    }
+
+
+# Vega-Lite top-level config per theme, built once.
+CHART_CONFIGS = {
+    is_dark: _chart_config(text_color, grid) for is_dark, (_, text_color, grid) in CHART_COLORS.items()
+}
+
+
+def bar_spec(encoding: dict, title: str, height: int, is_dark: bool) -> dict:
+    """Themed Vega-Lite bar chart spec; data is passed separately."""
+    config = CHART_CONFIGS[is_dark]
+    return {
+        "mark": {"type": "bar"},
+        "encoding": encoding,
+        "title": title,
+        "height": height,
+        "background": CHART_COLORS[is_dark][0],
+        "config": {
+            **config,
+            "view": {"continuousWidth": 300, "continuousHeight": 300, **config["view"]},
+        },
+    }
+
+
+def bar_chart_spec(col: str, x_title: str, title: str, height: int, is_dark: bool) -> dict:
+    """Vega-Lite spec for a themed (col, count) bar chart; data is passed separately."""
+    encoding = {
+        "x": {"field": col, "type": "nominal", "sort": "-y", "title": x_title},
+        "y": {"field": "count", "type": "quantitative", "title": "Count"},
+        "tooltip": [{"field": col, "type": "nominal"}, {"field": "count", "type": "quantitative"}],
+    }
+    return bar_spec(encoding, title, height, is_dark)
+
+
+def render_analytics(filtered: pd.DataFrame, value_matrices: dict[str, pd.DataFrame] | None = None):
+    if value_matrices is None:
+        value_matrices = build_value_matrices(filtered)
+
     is_dark = st.session_state.get("theme_mode", "Normal") == "Dark"
-    chart_bg = "#0f172a" if is_dark else "#ffffff"
-    chart_text = "#e5e7eb" if is_dark else "#1f2937"
-    chart_grid = "#334155" if is_dark else "#e5e7eb"
-
-    def themed_chart(chart: alt.Chart) -> alt.Chart:
-        return (
-            chart.properties(background=chart_bg)
-            .configure_axis(
-                labelColor=chart_text,
-                titleColor=chart_text,
-                gridColor=chart_grid,
-                domainColor=chart_grid,
-                tickColor=chart_grid,
-            )
-            .configure_title(color=chart_text)
-            .configure_view(stroke=chart_grid)
-            .configure_legend(labelColor=chart_text, titleColor=chart_text)
-        )
+
+    def bar_chart(data: pd.DataFrame, x_title: str, title: str, height: int, container=st):
+        # Plain Vega-Lite dict: skips Altair's schema validation and to_dict.
+        spec = bar_chart_spec(data.columns[0], x_title, title, height, is_dark)
+        container.vega_lite_chart(data, spec, width="stretch")
 
     left, right = st.columns([1.3, 1])
     with left:
-        class_df = (
-            filtered["therapeutic_class"]
-            .replace("", "missing")
-            .value_counts()
-            .rename_axis("therapeutic_class")
-            .reset_index(name="count")
-        )
-        class_df["therapeutic_class"] = class_df["therapeutic_class"].astype(str)
-        class_df["count"] = class_df["count"].astype(int)
-        class_chart = (
-            alt.Chart(class_df)
-            .mark_bar()
-            .encode(
-                x=alt.X("therapeutic_class:N", sort="-y", title="Therapeutic class"),
-                y=alt.Y("count:Q", title="Count"),
-                tooltip=["therapeutic_class:N", "count:Q"],
-            )
-            .properties(
-                title="Therapeutic Class Distribution",
-                height=390,
-            )
-        )
-        st.altair_chart(themed_chart(class_chart), width="stretch")
-
+        class_df = count_frame(filtered["therapeutic_class"], "therapeutic_class", "missing")
+        bar_chart(class_df, "Therapeutic class", "Therapeutic Class Distribution", 390)
     with right:
-        sponsor_df = (
-            filtered["sponsor"]
-            .replace("", pd.NA)
-            .dropna()
-            .value_counts()
-            .head(15)
-            .rename_axis("sponsor")
-            .reset_index(name="count")
-        )
-        sponsor_df["sponsor"] = sponsor_df["sponsor"].astype(str)
-        sponsor_df["count"] = sponsor_df["count"].astype(int)
-        sponsor_chart = (
-            alt.Chart(sponsor_df)
-            .mark_bar()
-            .encode(
-                x=alt.X("sponsor:N", sort="-y", title="Sponsor"),
-                y=alt.Y("count:Q", title="Count"),
-                tooltip=["sponsor:N", "count:Q"],
-            )
-            .properties(
-                title="Top Sponsors (Filtered)",
-                height=390,
-            )
-        )
-        st.altair_chart(themed_chart(sponsor_chart), width="stretch")
+        sponsor_df = count_frame(filtered["sponsor"], "sponsor", blank_label=None, top=15)
+        bar_chart(sponsor_df, "Sponsor", "Top Sponsors (Filtered)", 390)
 
     st.markdown("")
-    phase_df = (
-        filtered["phase"]
-        .replace("", "NA")
-        .value_counts()
-        .rename_axis("phase")
-        .reset_index(name="count")
-    )
-    phase_df["phase"] = phase_df["phase"].astype(str)
-    phase_df["count"] = phase_df["count"].astype(int)
-    phase_chart = (
-        alt.Chart(phase_df)
-        .mark_bar()
-        .encode(
-            x=alt.X("phase:N", sort="-y", title="Phase"),
-            y=alt.Y("count:Q", title="Count"),
-            tooltip=["phase:N", "count:Q"],
-        )
-        .properties(
-            title="Phase Distribution",
-            height=330,
-        )
-    )
-    st.altair_chart(themed_chart(phase_chart), width="stretch")
-
-    st.markdown("")
-    study_type_df = (
-        filtered["study_type"]
-        .replace("", "Unknown")
-        .value_counts()
-        .rename_axis("study_type")
-        .reset_index(name="count")
-    )
-    study_type_df["study_type"] = study_type_df["study_type"].astype(str)
-    study_type_df["count"] = study_type_df["count"].astype(int)
-    study_type_chart = (
-        alt.Chart(study_type_df)
-        .mark_bar()
-        .encode(
-            x=alt.X("study_type:N", sort="-y", title="Study type"),
-            y=alt.Y("count:Q", title="Count"),
-            tooltip=["study_type:N", "count:Q"],
-        )
-        .properties(
-            title="Study Type Distribution",
-            height=330,
-        )
-    )
-    st.altair_chart(themed_chart(study_type_chart), width="stretch")
+    phase_df = count_frame(filtered["phase"], "phase")
+    bar_chart(phase_df, "Phase", "Phase Distribution", 330)
 
     st.markdown("")
-    l2, r2 = st.columns([1, 1])
-    with l2:
-        status_df = (
-            filtered["status"]
-            .replace("", "NA")
-            .value_counts()
-            .rename_axis("status")
-            .reset_index(name="count")
-        )
-        status_chart = (
-            alt.Chart(status_df)
-            .mark_bar()
-            .encode(
-                x=alt.X("status:N", sort="-y", title="Status"),
-                y=alt.Y("count:Q", title="Count"),
-                tooltip=["status:N", "count:Q"],
-            )
-            .properties(
-                title="Status Distribution",
-                height=330,
-            )
-        )
-        st.altair_chart(themed_chart(status_chart), width="stretch")
-    with r2:
-        results_df = (
-            filtered["has_results"]
-            .replace("", "NA")
-            .value_counts()
-            .rename_axis("has_results")
-            .reset_index(name="count")
-        )
-        results_chart = (
-            alt.Chart(results_df)
-            .mark_bar()
-            .encode(
-                x=alt.X("has_results:N", sort="-y", title="Results"),
-                y=alt.Y("count:Q", title="Count"),
-                tooltip=["has_results:N", "count:Q"],
-            )
-            .properties(
-                title="Results Availability",
-                height=330,
-            )
-        )
-        st.altair_chart(themed_chart(results_chart), width="stretch")
+    study_type_df = count_frame(filtered["study_type"], "study_type", "Unknown")
+    bar_chart(study_type_df, "Study type", "Study Type Distribution", 330)
 
     st.markdown("")
-    l3, r3 = st.columns([1, 1])
-    with l3:
-        intervention_series = (
-            filtered["intervention_types"]
-            .apply(split_csv_values)
-            .explode()
-            .dropna()
-        )
-        if intervention_series.empty:
-            intervention_df = pd.DataFrame(
-                {"intervention_types": ["NA"], "count": [0]}
-            )
-        else:
-            intervention_df = (
-                intervention_series.value_counts()
-                .head(12)
-                .rename_axis("intervention_types")
-                .reset_index(name="count")
-            )
-        intervention_chart = (
-            alt.Chart(intervention_df)
-            .mark_bar()
-            .encode(
-                x=alt.X("intervention_types:N", sort="-y", title="Intervention type"),
-                y=alt.Y("count:Q", title="Count"),
-                tooltip=["intervention_types:N", "count:Q"],
-            )
-            .properties(
-                title="Intervention Type Distribution",
-                height=330,
-            )
-        )
-        st.altair_chart(themed_chart(intervention_chart), width="stretch")
-    with r3:
-        design_df = (
-            filtered["study_design"]
-            .replace("", "NA")
-            .value_counts()
-            .rename_axis("study_design")
-            .reset_index(name="count")
-        )
-        design_chart = (
-            alt.Chart(design_df)
-            .mark_bar()
-            .encode(
-                x=alt.X("study_design:N", sort="-y", title="Study design"),
-                y=alt.Y("count:Q", title="Count"),
-                tooltip=["study_design:N", "count:Q"],
-            )
-            .properties(
-                title="Study Design Distribution",
-                height=330,
-            )
-        )
-        st.altair_chart(themed_chart(design_chart), width="stretch")
+    # One two-column container for the 2x2 grid; equal chart heights keep
+    # the rows aligned without a second columns block.
+    grid_charts = [
+        (count_frame(filtered["status"], "status"), "Status", "Status Distribution"),
+        (count_frame(filtered["has_results"], "has_results"), "Results", "Results Availability"),
+        (
+            indicator_count_frame(
+                value_matrices["intervention_types"], filtered.index, "intervention_types", top=12
+            ),
+            "Intervention type",
+            "Intervention Type Distribution",
+        ),
+        (count_frame(filtered["study_design"], "study_design"), "Study design", "Study Design Distribution"),
+    ]
+    grid_cols = st.columns(2)
+    for i, (data, x_title, title) in enumerate(grid_charts):
+        bar_chart(data, x_title, title, 330, container=grid_cols[i % 2])
 
     st.markdown("")
     quality_df = filtered.copy()
@@ -1371,7 +1559,7 @@ def render_analytics(filtered: pd.DataFrame):
         "Negative lag anomalies (publication before primary completion) are excluded from lag analytics."
     )
 
-    lag_df = filtered.copy()
+    lag_df = filtered[["phase", "publication_lag_days"]].copy()
     lag_df["publication_lag_days"] = pd.to_numeric(
         lag_df["publication_lag_days"], errors="coerce"
     )
@@ -1389,20 +1577,21 @@ def render_analytics(filtered: pd.DataFrame):
     if lag_df.empty:
         st.info("No non-negative publication lag values are available for the current filters.")
     else:
-        lag_chart = (
-            alt.Chart(lag_df)
-            .mark_bar()
-            .encode(
-                x=alt.X("publication_lag_days:Q", bin=alt.Bin(maxbins=30), title="Publication lag (days)"),
-                y=alt.Y("count():Q", title="Trials"),
-                tooltip=["count():Q"],
-            )
-            .properties(
-                title="Publication Lag Histogram",
-                height=320,
-            )
+        lag_encoding = {
+            "x": {
+                "field": "publication_lag_days",
+                "type": "quantitative",
+                "bin": {"maxbins": 30},
+                "title": "Publication lag (days)",
+            },
+            "y": {"aggregate": "count", "type": "quantitative", "title": "Trials"},
+            "tooltip": [{"aggregate": "count", "type": "quantitative"}],
+        }
+        st.vega_lite_chart(
+            lag_df[["publication_lag_days"]],
+            bar_spec(lag_encoding, "Publication Lag Histogram", 320, is_dark),
+            width="stretch",
         )
-        st.altair_chart(themed_chart(lag_chart), width="stretch")
 
         phase_lag_df = (
             lag_df.groupby("phase", dropna=False)["publication_lag_days"]
@@ -1410,20 +1599,19 @@ def render_analytics(filtered: pd.DataFrame):
             .reset_index()
             .rename(columns={"publication_lag_days": "median_lag_days"})
         )
-        phase_lag_chart = (
-            alt.Chart(phase_lag_df)
-            .mark_bar()
-            .encode(
-                x=alt.X("phase:N", sort="-y", title="Phase"),
-                y=alt.Y("median_lag_days:Q", title="Median lag (days)"),
-                tooltip=["phase:N", "median_lag_days:Q"],
-            )
-            .properties(
-                title="Publication Lag by Phase (Median)",
-                height=320,
-            )
+        phase_lag_encoding = {
+            "x": {"field": "phase", "type": "nominal", "sort": "-y", "title": "Phase"},
+            "y": {"field": "median_lag_days", "type": "quantitative", "title": "Median lag (days)"},
+            "tooltip": [
+                {"field": "phase", "type": "nominal"},
+                {"field": "median_lag_days", "type": "quantitative"},
+            ],
+        }
+        st.vega_lite_chart(
+            phase_lag_df,
+            bar_spec(phase_lag_encoding, "Publication Lag by Phase (Median)", 320, is_dark),
+            width="stretch",
         )
-        st.altair_chart(themed_chart(phase_lag_chart), width="stretch")
 
     st.markdown("")
     phase_raw = filtered["phase"].fillna("").astype(str).str.lower()
@@ -1447,157 +1635,110 @@ def render_analytics(filtered: pd.DataFrame):
     )
     funnel_df["percent_of_phase1"] = (funnel_df["count"] / funnel_base * 100).round(1)
 
-    funnel_chart = (
-        alt.Chart(funnel_df)
-        .mark_bar()
-        .encode(
-            x=alt.X("stage:N", sort=None, title="Funnel stage"),
-            y=alt.Y("count:Q", title="Count"),
-            tooltip=["stage:N", "count:Q", "percent_of_phase1:Q"],
-        )
-        .properties(
-            title="Failure Funnel (Phase I → Phase II → Phase III → Published)",
-            height=320,
-        )
+    funnel_encoding = {
+        "x": {"field": "stage", "type": "nominal", "sort": None, "title": "Funnel stage"},
+        "y": {"field": "count", "type": "quantitative", "title": "Count"},
+        "tooltip": [
+            {"field": "stage", "type": "nominal"},
+            {"field": "count", "type": "quantitative"},
+            {"field": "percent_of_phase1", "type": "quantitative"},
+        ],
+    }
+    st.vega_lite_chart(
+        funnel_df,
+        bar_spec(funnel_encoding, "Failure Funnel (Phase I → Phase II → Phase III → Published)", 320, is_dark),
+        width="stretch",
     )
-    st.altair_chart(themed_chart(funnel_chart), width="stretch")
 
-    evidence_df = (
-        filtered["evidence_strength"]
-        .replace("", "unknown")
-        .value_counts()
-        .rename_axis("evidence_strength")
-        .reset_index(name="count")
-    )
-    evidence_chart = (
-        alt.Chart(evidence_df)
-        .mark_bar()
-        .encode(
-            x=alt.X("evidence_strength:N", sort="-y", title="Evidence strength"),
-            y=alt.Y("count:Q", title="Count"),
-            tooltip=["evidence_strength:N", "count:Q"],
-        )
-        .properties(
-            title="Evidence Strength Distribution",
-            height=320,
-        )
-    )
-    st.altair_chart(themed_chart(evidence_chart), width="stretch")
+    evidence_df = count_frame(filtered["evidence_strength"], "evidence_strength", "unknown")
+    bar_chart(evidence_df, "Evidence strength", "Evidence Strength Distribution", 320)
 
-    publication_method_series = (
-        filtered["publication_match_methods"]
-        .apply(split_csv_values)
-        .explode()
-        .dropna()
+    publication_method_df = indicator_count_frame(
+        value_matrices["publication_match_methods"], filtered.index, "publication_match_method"
     )
-    if publication_method_series.empty:
-        publication_method_df = pd.DataFrame(
-            {"publication_match_method": ["NA"], "count": [0]}
-        )
-    else:
-        publication_method_df = (
-            publication_method_series.value_counts()
-            .rename_axis("publication_match_method")
-            .reset_index(name="count")
-        )
-    publication_method_chart = (
-        alt.Chart(publication_method_df)
-        .mark_bar()
-        .encode(
-            x=alt.X("publication_match_method:N", sort="-y", title="Publication match method"),
-            y=alt.Y("count:Q", title="Count"),
-            tooltip=["publication_match_method:N", "count:Q"],
-        )
-        .properties(
-            title="Publication Match Method Distribution",
-            height=320,
-        )
-    )
-    st.altair_chart(themed_chart(publication_method_chart), width="stretch")
-
-
-def main():
-    st.set_page_config(
-        page_title="PDAC Trial Atlas",
-        page_icon="🧬",
-        layout="wide",
-        initial_sidebar_state="expanded",
+    bar_chart(
+        publication_method_df,
+        "Publication match method",
+        "Publication Match Method Distribution",
+        320,
     )
 
-    if "theme_mode" not in st.session_state:
-        st.session_state["theme_mode"] = "Normal"
-    theme_mode = st.session_state["theme_mode"]
-
-    if theme_mode == "Dark":
-        colors = {
-            "bg": "radial-gradient(circle at 2% 2%, #111827 0%, #0f172a 45%, #111827 100%)",
-            "heading": "#e5e7eb",
-            "card_bg": "rgba(17, 24, 39, 0.9)",
-            "card_border": "#374151",
-            "label": "#9ca3af",
-            "value": "#f9fafb",
-            "tab_bg": "#111827",
-            "tab_border": "#374151",
-            "tab_text": "#e5e7eb",
-            "tab_active_bg": "#f9fafb",
-            "tab_active_text": "#111827",
-            "version_bg": "#1f2937",
-            "version_border": "#374151",
-            "license_bg": "#111827",
-            "license_border": "#374151",
-            "license_text": "#d1d5db",
-            "grid_bg": "#111827",
-            "grid_header_bg": "#1f2937",
-            "grid_text": "#e5e7eb",
-            "grid_border": "#374151",
-            "sidebar_bg": "#0f172a",
-            "sidebar_border": "#334155",
-            "sidebar_input_bg": "#111827",
-            "toggle_off_bg": "#334155",
-            "multiselect_bg": "#0f172a",
-            "multiselect_text": "#e5e7eb",
-            "multiselect_tag_bg": "#1f2937",
-            "multiselect_tag_text": "#e5e7eb",
-            "multiselect_menu_bg": "#0f172a",
-            "multiselect_clear_icon": "#cbd5e1",
-            "multiselect_placeholder": "#cbd5e1",
-        }
-    else:
-        colors = {
-            "bg": "radial-gradient(circle at 2% 2%, #fff5e6 0%, #f2f6ff 42%, #eefaf4 100%)",
-            "heading": "#1b2440",
-            "card_bg": "rgba(255, 255, 255, 0.9)",
-            "card_border": "#e6eaf3",
-            "label": "#5f6d89",
-            "value": "#1b2440",
-            "tab_bg": "#f8fbff",
-            "tab_border": "#cfd8ea",
-            "tab_text": "#1b2440",
-            "tab_active_bg": "#1b2440",
-            "tab_active_text": "#ffffff",
-            "version_bg": "#f3f4f6",
-            "version_border": "#d1d5db",
-            "license_bg": "#f3f4f6",
-            "license_border": "#d1d5db",
-            "license_text": "#1f2937",
-            "grid_bg": "#ffffff",
-            "grid_header_bg": "#f8fafc",
-            "grid_text": "#1f2937",
-            "grid_border": "#e5e7eb",
-            "sidebar_bg": "#f8fafc",
-            "sidebar_border": "#dbe3ee",
-            "sidebar_input_bg": "#edf2f7",
-            "toggle_off_bg": "#111827",
-            "multiselect_bg": "#eef2f7",
-            "multiselect_text": "#1f2937",
-            "multiselect_tag_bg": "#e2e8f0",
-            "multiselect_tag_text": "#1f2937",
-            "multiselect_menu_bg": "#ffffff",
-            "multiselect_clear_icon": "#64748b",
-            "multiselect_placeholder": "#64748b",
-        }
 
-    st.markdown(
+THEME_COLORS = {
+    "Dark": {
+        "bg": "radial-gradient(circle at 2% 2%, #111827 0%, #0f172a 45%, #111827 100%)",
+        "heading": "#e5e7eb",
+        "card_bg": "rgba(17, 24, 39, 0.9)",
+        "card_border": "#374151",
+        "label": "#9ca3af",
+        "value": "#f9fafb",
+        "tab_bg": "#111827",
+        "tab_border": "#374151",
+        "tab_text": "#e5e7eb",
+        "tab_active_bg": "#f9fafb",
+        "tab_active_text": "#111827",
+        "version_bg": "#1f2937",
+        "version_border": "#374151",
+        "license_bg": "#111827",
+        "license_border": "#374151",
+        "license_text": "#d1d5db",
+        "grid_bg": "#111827",
+        "grid_header_bg": "#1f2937",
+        "grid_text": "#e5e7eb",
+        "grid_border": "#374151",
+        "sidebar_bg": "#0f172a",
+        "sidebar_border": "#334155",
+        "sidebar_input_bg": "#111827",
+        "toggle_off_bg": "#334155",
+        "multiselect_bg": "#0f172a",
+        "multiselect_text": "#e5e7eb",
+        "multiselect_tag_bg": "#1f2937",
+        "multiselect_tag_text": "#e5e7eb",
+        "multiselect_menu_bg": "#0f172a",
+        "multiselect_clear_icon": "#cbd5e1",
+        "multiselect_placeholder": "#cbd5e1",
+    },
+    "Normal": {
+        "bg": "radial-gradient(circle at 2% 2%, #fff5e6 0%, #f2f6ff 42%, #eefaf4 100%)",
+        "heading": "#1b2440",
+        "card_bg": "rgba(255, 255, 255, 0.9)",
+        "card_border": "#e6eaf3",
+        "label": "#5f6d89",
+        "value": "#1b2440",
+        "tab_bg": "#f8fbff",
+        "tab_border": "#cfd8ea",
+        "tab_text": "#1b2440",
+        "tab_active_bg": "#1b2440",
+        "tab_active_text": "#ffffff",
+        "version_bg": "#f3f4f6",
+        "version_border": "#d1d5db",
+        "license_bg": "#f3f4f6",
+        "license_border": "#d1d5db",
+        "license_text": "#1f2937",
+        "grid_bg": "#ffffff",
+        "grid_header_bg": "#f8fafc",
+        "grid_text": "#1f2937",
+        "grid_border": "#e5e7eb",
+        "sidebar_bg": "#f8fafc",
+        "sidebar_border": "#dbe3ee",
+        "sidebar_input_bg": "#edf2f7",
+        "toggle_off_bg": "#111827",
+        "multiselect_bg": "#eef2f7",
+        "multiselect_text": "#1f2937",
+        "multiselect_tag_bg": "#e2e8f0",
+        "multiselect_tag_text": "#1f2937",
+        "multiselect_menu_bg": "#ffffff",
+        "multiselect_clear_icon": "#64748b",
+        "multiselect_placeholder": "#64748b",
+    },
+}
+
+
+@lru_cache(maxsize=2)
+def theme_css(theme_mode: str) -> str:
+    """The page <style> block for a theme, formatted once per process."""
+    colors = THEME_COLORS["Dark" if theme_mode == "Dark" else "Normal"]
+    return (
         f"""
         <style>
             .stApp {{ background: {colors["bg"]}; }}
@@ -2016,12 +2157,34 @@ def main():
             }}
             .main .block-container {{ padding-top: 0.22rem; padding-bottom: 1rem; }}
         </style>
-        """,
-        unsafe_allow_html=True,
+        """
     )
 
-    db_mtime = DB_PATH.stat().st_mtime if DB_PATH.exists() else 0.0
-    df = load_trials(db_mtime)
+
+def _sync_theme_mode():
+    # Runs before the rerun the toggle triggers, so that single rerun already
+    # renders the new theme; no follow-up st.rerun() needed.
+    st.session_state["theme_mode"] = "Dark" if st.session_state["theme_mode_toggle_top"] else "Normal"
+
+
+def main():
+    st.set_page_config(
+        page_title="PDAC Trial Atlas",
+        page_icon="🧬",
+        layout="wide",
+        initial_sidebar_state="expanded",
+    )
+
+    if "theme_mode" not in st.session_state:
+        st.session_state["theme_mode"] = "Normal"
+    theme_mode = st.session_state["theme_mode"]
+
+    # Style-only HTML goes to the event container: no markdown parse and no
+    # empty element in the page layout.
+    st.html(theme_css(theme_mode))
+
+    version = db_version()
+    df, facets, value_matrices = _session_trials(version)
     if df.empty:
         st.warning("No local dataset found yet.")
         st.caption(
@@ -2044,30 +2207,31 @@ def main():
         with header_title_col:
             st.markdown("<h1 class='header-title-compact'>🧬 PDAC Trial Atlas</h1>", unsafe_allow_html=True)
         with mode_toggle_col:
-            dark_mode_enabled = st.toggle(
+            st.toggle(
                 "Dark mode",
                 value=theme_mode == "Dark",
                 key="theme_mode_toggle_top",
+                on_change=_sync_theme_mode,
             )
-            requested_mode = "Dark" if dark_mode_enabled else "Normal"
-            if st.session_state.get("theme_mode") != requested_mode:
-                st.session_state["theme_mode"] = requested_mode
-                st.rerun()
 
         st.markdown(
             "<div class='subtitle-strong'>Explore trials and analytics from the current filtered dataset.</div>",
             unsafe_allow_html=True,
         )
-    filtered = apply_filters(df)
-
-    tab1, tab2 = st.tabs(["Explorer", "Analytics"])
-
-    with tab1:
-        with st.container(key="metrics_banner_block"):
-            metrics_row(df, filtered)
-        render_explorer(filtered)
-    with tab2:
-        render_analytics(filtered)
+    filtered = apply_filters(df, facets, value_matrices, dataset_key=version)
+
+    # on_change="rerun" makes tab selection part of widget state, so only the
+    # open tab's body runs instead of both on every rerun.
+    tab1, tab2 = st.tabs(["Explorer", "Analytics"], key="main_tabs", on_change="rerun")
+
+    if tab1.open:
+        with tab1:
+            with st.container(key="metrics_banner_block"):
+                metrics_row(df, filtered)
+            render_explorer(filtered)
+    if tab2.open:
+        with tab2:
+            render_analytics(filtered, value_matrices)
 
 if __name__ == "__main__":
     main()
@@ -4,9 +4,10 @@ validation, and downstream analysis.
 """
 
 import csv
+from collections import defaultdict
 from db.session import SessionLocal
 from db.models import ClinicalTrial, ClinicalTrialDetails, ClinicalTrialPublication
-from sqlalchemy import text
+from sqlalchemy import select, text
 
 
 OUTPUT_FILE = "pdac_trials_export.csv"
@@ -33,7 +34,6 @@ def run():
             """
         )
     )
-    trials = db.query(ClinicalTrial).order_by(ClinicalTrial.nct_id).all()
     publication_columns = {
         row[1] for row in db.execute(text("PRAGMA table_info(trial_publications)")).fetchall()
     }
@@ -48,6 +48,24 @@ def run():
         db.commit()
     has_full_match_column = "is_full_match" in publication_columns
 
+    # Bulk read as plain Core rows: three queries in total instead of two
+    # lookups per trial, and no ORM identity-map overhead.
+    trials = db.execute(
+        select(ClinicalTrial.__table__).order_by(ClinicalTrial.nct_id)
+    ).all()
+    details_by_id = {
+        d.nct_id: d for d in db.execute(select(ClinicalTrialDetails.__table__)).all()
+    }
+    pubs_query = select(
+        ClinicalTrialPublication.nct_id,
+        ClinicalTrialPublication.match_method,
+    )
+    if has_full_match_column:
+        pubs_query = pubs_query.where(ClinicalTrialPublication.is_full_match == "yes")
+    pubs_by_id = defaultdict(list)
+    for p in db.execute(pubs_query).all():
+        pubs_by_id[p.nct_id].append(p)
+
     with open(OUTPUT_FILE, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
 
@@ -97,14 +115,8 @@ def run():
         # Rows
         # --------------------------------------------------
         for t in trials:
-            d = db.get(ClinicalTrialDetails, t.nct_id)
-            pubs_query = (
-                db.query(ClinicalTrialPublication)
-                .filter(ClinicalTrialPublication.nct_id == t.nct_id)
-            )
-            if has_full_match_column:
-                pubs_query = pubs_query.filter(ClinicalTrialPublication.is_full_match == "yes")
-            pubs = pubs_query.all()
+            d = details_by_id.get(t.nct_id)
+            pubs = pubs_by_id.get(t.nct_id, [])
             publication_count = len(pubs)
             publication_match_methods = ",".join(
                 sorted(
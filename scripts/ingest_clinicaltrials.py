@@ -22,8 +22,11 @@ from ingest.clinicaltrials import fetch_trials_pancreas, _fetch_pubmed_links_by_
 from ingest.ctis import fetch_trials_ctis_pdac
 from ingest.euctr import fetch_trials_euctr_pdac
 from db.session import SessionLocal, init_db
-from db.models import ClinicalTrial, ClinicalTrialDetails, ClinicalTrialPublication
-from sqlalchemy import text
+from db.models import ClinicalTrial, ClinicalTrialDetails, ClinicalTrialPublication, TrialTag
+from db.queries import get_trials_by_ids
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload, lazyload
 
 PUBMED_SUMMARY_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
 PUBMED_FETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
@@ -794,9 +797,12 @@ def ensure_publications_table(session) -> None:
         )
     session.execute(
         text(
-            "CREATE INDEX IF NOT EXISTS idx_trial_publications_nct_id ON trial_publications(nct_id)"
+            "CREATE INDEX IF NOT EXISTS idx_trial_publications_nct_pmid ON trial_publications(nct_id, pmid)"
         )
     )
+    # Single-column nct_id indexes are covered by the (nct_id, pmid) prefix.
+    session.execute(text("DROP INDEX IF EXISTS idx_trial_publications_nct_id"))
+    session.execute(text("DROP INDEX IF EXISTS ix_trial_publications_nct_id"))
     session.execute(
         text(
             "CREATE INDEX IF NOT EXISTS idx_trial_publications_pmid ON trial_publications(pmid)"
@@ -807,9 +813,13 @@ def ensure_publications_table(session) -> None:
             "CREATE INDEX IF NOT EXISTS idx_trial_publications_doi ON trial_publications(doi)"
         )
     )
+    # is_full_match is a yes/no flag: a partial index on the "yes" rows is
+    # far smaller than a full-column index and is actually used by the planner.
+    session.execute(text("DROP INDEX IF EXISTS idx_trial_publications_full_match"))
     session.execute(
         text(
-            "CREATE INDEX IF NOT EXISTS idx_trial_publications_full_match ON trial_publications(is_full_match)"
+            "CREATE INDEX IF NOT EXISTS idx_trial_publications_full_match_yes "
+            "ON trial_publications(nct_id) WHERE is_full_match = 'yes'"
         )
     )
     session.commit()
@@ -879,11 +889,7 @@ def rebuild_trial_publications(
     trials = session.query(ClinicalTrial).all()
     trials.sort(key=_trial_priority_key)
     for trial in trials:
-        existing_publications = (
-            session.query(ClinicalTrialPublication)
-            .filter(ClinicalTrialPublication.nct_id == trial.nct_id)
-            .all()
-        )
+        existing_publications = list(trial.publications)
         existing_by_pmid: dict[str, ClinicalTrialPublication] = {}
         existing_by_doi: dict[str, ClinicalTrialPublication] = {}
         for pub in existing_publications:
@@ -984,9 +990,8 @@ def rebuild_trial_publications(
             keyword_min_len = int(os.getenv("PUBMED_TITLE_KEYWORD_MIN_LEN", "4"))
             year_lookback = int(os.getenv("PUBMED_TITLE_YEAR_LOOKBACK", "1"))
             year_lookahead = int(os.getenv("PUBMED_TITLE_YEAR_LOOKAHEAD", "12"))
-            details = session.get(ClinicalTrialDetails, trial.nct_id)
             keywords = _extract_pubmed_keywords(
-                details,
+                trial.details,
                 max_keywords=keyword_limit,
                 min_len=keyword_min_len,
             )
@@ -1163,7 +1168,7 @@ def rebuild_trial_publications(
     publication_rows = session.query(ClinicalTrialPublication).count()
     full_match_rows = (
         session.query(ClinicalTrialPublication)
-        .filter(text("LOWER(COALESCE(is_full_match, '')) = 'yes'"))
+        .filter(text("is_full_match = 'yes'"))
         .count()
     )
     candidate_rows = (
@@ -1174,7 +1179,7 @@ def rebuild_trial_publications(
     full_trial_ids = {
         row[0]
         for row in session.execute(
-            text("SELECT DISTINCT nct_id FROM trial_publications WHERE LOWER(COALESCE(is_full_match, '')) = 'yes'")
+            text("SELECT DISTINCT nct_id FROM trial_publications WHERE is_full_match = 'yes'")
         ).fetchall()
     }
     candidate_trial_ids = {
@@ -1206,12 +1211,15 @@ def refresh_trial_publication_summary(session) -> int:
     updated = 0
     trials = session.query(ClinicalTrial).order_by(ClinicalTrial.nct_id.asc()).all()
     for trial in trials:
-        pubs = (
-            session.query(ClinicalTrialPublication)
-            .filter(ClinicalTrialPublication.nct_id == trial.nct_id)
-            .filter(ClinicalTrialPublication.is_full_match == "yes")
-            .order_by(ClinicalTrialPublication.confidence.desc(), ClinicalTrialPublication.publication_date.asc())
-            .all()
+        # Same ordering as ORDER BY confidence DESC, publication_date ASC in SQLite.
+        pubs = sorted(
+            (pub for pub in trial.publications if pub.is_full_match == "yes"),
+            key=lambda pub: (
+                pub.confidence is None,
+                -(pub.confidence or 0),
+                pub.publication_date is not None,
+                pub.publication_date or "",
+            ),
         )
         if not pubs:
             continue
@@ -1264,13 +1272,7 @@ def improve_therapeutic_class_ensemble(session, max_lookups: int = 200) -> int:
     updated = 0
     for trial in candidates:
         mesh_terms = []
-        pmids = [
-            _clean(pub.pmid)
-            for pub in session.query(ClinicalTrialPublication)
-            .filter(ClinicalTrialPublication.nct_id == trial.nct_id)
-            .all()
-            if _clean(pub.pmid).isdigit()
-        ]
+        pmids = trial.pmids
         if not pmids:
             pmids = _extract_pmids(trial.pubmed_links)
         if pmids:
@@ -1370,9 +1372,13 @@ def compute_signal_fields(session) -> int:
         }
     )
 
+    trials_by_id = {
+        trial.nct_id: trial
+        for trial in session.query(ClinicalTrial).options(lazyload("*")).all()
+    }
     updated = 0
     for row in updates.itertuples(index=False):
-        trial = session.get(ClinicalTrial, row.nct_id)
+        trial = trials_by_id.get(row.nct_id)
         if not trial:
             continue
         trial.evidence_strength = row.evidence_strength
@@ -1395,19 +1401,26 @@ def merge_ctis_overlaps(session):
     - if CTIS row has secondary_id=NCTxxxxx and that NCT exists as a row,
       merge CTIS enrichment into that NCT row and remove CTIS duplicate row.
     """
+    # Both sides of the merge read the deferred free-text detail columns.
+    full_details = joinedload(ClinicalTrial.details).undefer_group("full_text")
     ctis_trials = (
         session.query(ClinicalTrial)
+        .options(full_details)
         .filter(ClinicalTrial.source == "ctis")
         .filter(ClinicalTrial.secondary_id.like("NCT%"))
         .all()
     )
 
+    us_trials_by_id = get_trials_by_ids(
+        session, [(t.secondary_id or "").strip() for t in ctis_trials], full_details
+    )
+
     merged_count = 0
     for eu_trial in ctis_trials:
         nct_id = (eu_trial.secondary_id or "").strip()
         if not nct_id:
             continue
-        us_trial = session.get(ClinicalTrial, nct_id)
+        us_trial = us_trials_by_id.get(nct_id)
         if not us_trial:
             continue
         if us_trial is eu_trial:
@@ -1458,11 +1471,11 @@ def merge_ctis_overlaps(session):
             if not is_na(eu_trial.pdac_match_reason):
                 us_trial.pdac_match_reason = eu_trial.pdac_match_reason
 
-        us_details = session.get(ClinicalTrialDetails, us_trial.nct_id)
+        us_details = us_trial.details
         if not us_details:
             us_details = ClinicalTrialDetails(nct_id=us_trial.nct_id)
-            session.add(us_details)
-        eu_details = session.get(ClinicalTrialDetails, eu_trial.nct_id)
+            us_trial.details = us_details
+        eu_details = eu_trial.details
 
         if eu_details:
             us_details.conditions = as_na(_merge_values(us_details.conditions, eu_details.conditions, sep=" | "))
@@ -1496,7 +1509,7 @@ def merge_ctis_overlaps(session):
 
 def ensure_columns(session):
     """
-    Lightweight SQLite schema migration for new metadata columns.
+    Lightweight SQLite schema migration for new metadata columns and indexes.
     """
     required = {
         "source": "TEXT",
@@ -1514,12 +1527,36 @@ def ensure_columns(session):
         "publication_lag_days": "INTEGER",
         "evidence_strength": "TEXT",
         "dead_end": "TEXT",
+        "version": "INTEGER NOT NULL DEFAULT 0",
     }
     rows = session.execute(text("PRAGMA table_info(clinical_trials)")).fetchall()
     existing = {row[1] for row in rows}
     for col, col_type in required.items():
         if col not in existing:
             session.execute(text(f"ALTER TABLE clinical_trials ADD COLUMN {col} {col_type}"))
+    for index in ClinicalTrial.__table__.indexes:
+        index.create(bind=session.connection(), checkfirst=True)
+
+    rows = session.execute(text("PRAGMA table_info(trial_publications)")).fetchall()
+    publication_columns = {row[1] for row in rows}
+    if "is_full_match" in publication_columns:
+        # Older writers stored mixed-case flags; the stats queries and the
+        # partial index match is_full_match = 'yes' exactly.
+        session.execute(
+            text(
+                "UPDATE trial_publications SET is_full_match = LOWER(TRIM(is_full_match)) "
+                "WHERE is_full_match <> LOWER(TRIM(is_full_match))"
+            )
+        )
+    if "match_method" in publication_columns:
+        # Method names are emitted lower-case; fold stray case/whitespace and
+        # store blanks as NULL so GROUP_CONCAT(match_method) skips them.
+        session.execute(
+            text(
+                "UPDATE trial_publications SET match_method = NULLIF(LOWER(TRIM(match_method)), '') "
+                "WHERE match_method IS NOT NULLIF(LOWER(TRIM(match_method)), '')"
+            )
+        )
     session.commit()
 
 
@@ -1636,6 +1673,165 @@ def enrich_pubmed_links(session, max_lookups: int = 200):
 # Main ingestion routine
 # -------------------------------------------------------------------
 
+# Columns only written when the source row provides them; otherwise the
+# stored value is kept.
+OPTIONAL_TRIAL_FIELDS = ("publication_date", "publication_lag_days", "evidence_strength", "dead_end")
+UPSERT_CHUNK_SIZE = 5000
+
+
+def _study_to_rows(s: dict) -> tuple[dict, dict]:
+    """
+    Map one fetched study to (clinical_trials row, clinical_trial_details row).
+    """
+    nct_id = s["nct_id"]
+    source = (s.get("source") or "").strip().lower()
+    trial_row = {
+        "nct_id": nct_id,
+        "version": 1,
+        "source": as_na(source if source else "clinicaltrials.gov"),
+        "secondary_id": as_na(s.get("secondary_id")),
+        "trial_link": as_na(
+            s.get("trial_link")
+            or (f"https://clinicaltrials.gov/study/{nct_id}" if nct_id.startswith("NCT") else "")
+        ),
+        "title": as_na(s.get("title")),
+        "study_type": as_na(s.get("study_type")),
+        "phase": as_na(s.get("phase")),
+        "status": as_na(s.get("status")),
+        "sponsor": as_na(s.get("sponsor")),
+        "admission_date": as_na(s.get("admission_date")),
+        "last_update_date": as_na(s.get("last_update_date")),
+        "primary_completion_date": as_na(s.get("primary_completion_date")),
+        "has_results": as_na(s.get("has_results")),
+        "results_last_update": as_na(s.get("results_last_update")),
+        "pubmed_links": as_na(s.get("pubmed_links")),
+        "intervention_types": as_na(s.get("intervention_types")),
+        "study_design": as_na(s.get("study_design")),
+        "therapeutic_class": as_na(s.get("therapeutic_class")),
+        "focus_tags": as_na(s.get("focus_tags")),
+        "pdac_match_reason": as_na(s.get("pdac_match_reason")),
+    }
+    if "publication_date" in s:
+        trial_row["publication_date"] = as_na(s.get("publication_date"))
+    if "publication_lag_days" in s:
+        trial_row["publication_lag_days"] = s.get("publication_lag_days")
+    if "evidence_strength" in s:
+        trial_row["evidence_strength"] = as_na(s.get("evidence_strength"))
+    if "dead_end" in s:
+        trial_row["dead_end"] = as_na(s.get("dead_end"))
+
+    details_row = {
+        "nct_id": nct_id,
+        "conditions": as_na(s.get("conditions")),
+        "interventions": as_na(s.get("interventions")),
+        "primary_outcomes": as_na(s.get("primary_outcomes")),
+        "secondary_outcomes": as_na(s.get("secondary_outcomes")),
+        "inclusion_criteria": as_na(s.get("inclusion_criteria")),
+        "exclusion_criteria": as_na(s.get("exclusion_criteria")),
+        "locations": as_na(s.get("locations")),
+        "brief_summary": as_na(s.get("brief_summary")),
+        "detailed_description": as_na(s.get("detailed_description")),
+    }
+    return trial_row, details_row
+
+
+def _upsert_rows(session, table, rows: list[dict], chunk_size: int, set_overrides: Optional[dict] = None) -> None:
+    """
+    INSERT ... ON CONFLICT(pk) DO UPDATE for rows sharing the same key set,
+    executed as chunked executemany batches. ``set_overrides`` replaces the
+    default "take the incoming value" assignment for specific columns.
+    """
+    if not rows:
+        return
+    if session.get_bind().dialect.name == "postgresql":
+        dialect_insert = postgresql.insert
+    else:
+        dialect_insert = sqlite.insert
+
+    pk_cols = [col.name for col in table.primary_key.columns]
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=pk_cols,
+        set_={
+            key: (set_overrides or {}).get(key, stmt.excluded[key])
+            for key in rows[0]
+            if key not in pk_cols
+        },
+    )
+    for offset in range(0, len(rows), chunk_size):
+        session.execute(stmt, rows[offset:offset + chunk_size])
+
+
+def bulk_upsert_trials(session, studies: list[dict], chunk_size: int = UPSERT_CHUNK_SIZE) -> tuple[int, int]:
+    """
+    Upsert fetched studies into clinical_trials and clinical_trial_details.
+
+    Uses Core INSERT ... ON CONFLICT DO UPDATE instead of the ORM unit of
+    work. Returns (inserted, updated) counted per study, so a study id seen
+    twice in one batch counts once as inserted and once as updated.
+    """
+    existing_ids = set(session.execute(select(ClinicalTrial.nct_id)).scalars())
+    trial_rows: dict[str, dict] = {}
+    details_rows: dict[str, dict] = {}
+    inserted = 0
+    updated = 0
+    for s in studies:
+        trial_row, details_row = _study_to_rows(s)
+        nct_id = trial_row["nct_id"]
+        if nct_id in existing_ids or nct_id in trial_rows:
+            updated += 1
+        else:
+            inserted += 1
+        # Later rows for the same id win, but keep optional fields an earlier
+        # row set and this one omits.
+        trial_rows.setdefault(nct_id, {}).update(trial_row)
+        details_rows[nct_id] = details_row
+
+    # executemany needs one key set per statement; group by which optional
+    # fields are present so absent ones are left untouched on conflict.
+    groups: dict[tuple, list[dict]] = {}
+    for row in trial_rows.values():
+        present = tuple(key for key in OPTIONAL_TRIAL_FIELDS if key in row)
+        groups.setdefault(present, []).append(row)
+    # Core writes bypass the mapper's version counter, so bump it here.
+    trial_table = ClinicalTrial.__table__
+    version_bump = {"version": trial_table.c.version + 1}
+    for rows in groups.values():
+        _upsert_rows(session, trial_table, rows, chunk_size, set_overrides=version_bump)
+    _upsert_rows(session, ClinicalTrialDetails.__table__, list(details_rows.values()), chunk_size)
+    return inserted, updated
+
+
+def sync_trial_tags(session) -> int:
+    """
+    Rebuild trial_tags from clinical_trials.focus_tags.
+
+    Only the difference is written: stale (nct_id, tag) pairs are deleted
+    and missing ones inserted. Returns the number of rows changed.
+    """
+    tag_table = TrialTag.__table__
+    wanted = set()
+    for nct_id, focus_tags in session.execute(select(ClinicalTrial.nct_id, ClinicalTrial.focus_tags)):
+        for tag in (focus_tags or "").split(","):
+            tag = tag.strip()
+            if tag and tag != "NA":
+                wanted.add((nct_id, tag))
+    existing = {tuple(row) for row in session.execute(select(tag_table.c.nct_id, tag_table.c.tag))}
+
+    stale = existing - wanted
+    missing = wanted - existing
+    if stale:
+        stmt = tag_table.delete().where(
+            tag_table.c.nct_id == bindparam("b_nct_id"),
+            tag_table.c.tag == bindparam("b_tag"),
+        )
+        session.execute(stmt, [{"b_nct_id": nct_id, "b_tag": tag} for nct_id, tag in stale])
+    if missing:
+        session.execute(tag_table.insert(), [{"nct_id": nct_id, "tag": tag} for nct_id, tag in missing])
+    session.commit()
+    return len(stale) + len(missing)
+
+
 def run():
     """
     Main ingestion flow:
@@ -1695,73 +1891,7 @@ def run():
 
     studies = ctgov_studies + ctis_studies + euctr_studies
 
-    inserted = 0
-    updated = 0
-
-    for s in studies:
-        nct_id = s["nct_id"]
-
-        trial = session.get(ClinicalTrial, nct_id)
-        if not trial:
-            trial = ClinicalTrial(nct_id=nct_id)
-            session.add(trial)
-            inserted += 1
-        else:
-            updated += 1
-
-        # -----------------------------
-        # Core fields
-        # -----------------------------
-        source = (s.get("source") or "").strip().lower()
-        trial.source = as_na(source if source else "clinicaltrials.gov")
-        trial.secondary_id = as_na(s.get("secondary_id"))
-        trial.trial_link = as_na(
-            s.get("trial_link")
-            or (f"https://clinicaltrials.gov/study/{nct_id}" if nct_id.startswith("NCT") else "")
-        )
-        trial.title = as_na(s.get("title"))
-        trial.study_type = as_na(s.get("study_type"))
-        trial.phase = as_na(s.get("phase"))
-        trial.status = as_na(s.get("status"))
-        trial.sponsor = as_na(s.get("sponsor"))
-        trial.admission_date = as_na(s.get("admission_date"))
-        trial.last_update_date = as_na(s.get("last_update_date"))
-        trial.primary_completion_date = as_na(s.get("primary_completion_date"))
-        trial.has_results = as_na(s.get("has_results"))
-        trial.results_last_update = as_na(s.get("results_last_update"))
-        trial.pubmed_links = as_na(s.get("pubmed_links"))
-        trial.intervention_types = as_na(s.get("intervention_types"))
-        if "publication_date" in s:
-            trial.publication_date = as_na(s.get("publication_date"))
-        if "publication_lag_days" in s:
-            trial.publication_lag_days = s.get("publication_lag_days")
-        if "evidence_strength" in s:
-            trial.evidence_strength = as_na(s.get("evidence_strength"))
-        if "dead_end" in s:
-            trial.dead_end = as_na(s.get("dead_end"))
-
-        # -----------------------------
-        # Semantic classification
-        # -----------------------------
-        trial.study_design = as_na(s.get("study_design"))
-        trial.therapeutic_class = as_na(s.get("therapeutic_class"))
-        trial.focus_tags = as_na(s.get("focus_tags"))
-        trial.pdac_match_reason = as_na(s.get("pdac_match_reason"))
-
-        details = session.get(ClinicalTrialDetails, nct_id)
-        if not details:
-            details = ClinicalTrialDetails(nct_id=nct_id)
-            session.add(details)
-        details.conditions = as_na(s.get("conditions"))
-        details.interventions = as_na(s.get("interventions"))
-        details.primary_outcomes = as_na(s.get("primary_outcomes"))
-        details.secondary_outcomes = as_na(s.get("secondary_outcomes"))
-        details.inclusion_criteria = as_na(s.get("inclusion_criteria"))
-        details.exclusion_criteria = as_na(s.get("exclusion_criteria"))
-        details.locations = as_na(s.get("locations"))
-        details.brief_summary = as_na(s.get("brief_summary"))
-        details.detailed_description = as_na(s.get("detailed_description"))
-
+    inserted, updated = bulk_upsert_trials(session, studies)
     session.commit()
 
     pubmed_lookup_limit = int(os.getenv("PUBMED_LOOKUP_LIMIT", "200"))
@@ -1795,6 +1925,7 @@ def run():
     pubmed_dates = backfill_pubmed_publication_dates(session, max_lookups=pubmed_date_limit)
     mesh_updated = improve_therapeutic_class_ensemble(session, max_lookups=mesh_lookup_limit)
     signal_updated = compute_signal_fields(session)
+    tags_synced = sync_trial_tags(session)
 
     print(f"\nTrials processed: {len(studies)}")
     print(f"ClinicalTrials.gov rows: {len(ctgov_studies)}")
@@ -1832,6 +1963,7 @@ def run():
     print(f"PubMed publication dates added: {pubmed_dates}")
     print(f"Therapeutic class updated via ensemble: {mesh_updated}")
     print(f"Signal fields updated: {signal_updated}")
+    print(f"Trial tag rows changed: {tags_synced}")
 
     session.close()
 
@@ -9,7 +9,7 @@ from collections import Counter
 
 from db.models import ClinicalTrial, ClinicalTrialDetails, ClinicalTrialPublication
 from db.session import SessionLocal
-from sqlalchemy import text
+from sqlalchemy import select, text
 
 
 def print_section(title: str):
@@ -94,8 +94,10 @@ def run(
     max_unknown_evidence_ratio: float,
 ):
     db = SessionLocal()
-    trials = db.query(ClinicalTrial).all()
-    details = db.query(ClinicalTrialDetails).all()
+    # The report only reads attributes, so plain Core rows are enough and skip
+    # ORM identity-map bookkeeping and relationship loading.
+    trials = db.execute(select(ClinicalTrial.__table__)).all()
+    details = db.execute(select(ClinicalTrialDetails.__table__)).all()
     db.execute(
         text(
             """
@@ -125,7 +127,7 @@ def run(
             )
         )
         db.commit()
-    publications = db.query(ClinicalTrialPublication).all()
+    publications = db.execute(select(ClinicalTrialPublication.__table__)).all()
     full_publication_rows = [
         p for p in publications if (p.is_full_match or "").strip().lower() == "yes"
     ]
@@ -0,0 +1,76 @@
+import unittest
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.models import ClinicalTrial, ClinicalTrialDetails
+from db.session import Base
+from scripts.ingest_clinicaltrials import bulk_upsert_trials
+
+
+class BulkUpsertTests(unittest.TestCase):
+    def setUp(self):
+        self.db_path = Path("tests/tmp_bulk_upsert.db")
+        if self.db_path.exists():
+            self.db_path.unlink()
+        self.engine = create_engine(f"sqlite:///{self.db_path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+
+    def tearDown(self):
+        self.engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def test_inserts_then_updates_and_keeps_omitted_optional_fields(self):
+        session = self.Session()
+        inserted, updated = bulk_upsert_trials(
+            session,
+            [
+                {"nct_id": "NCT00000001", "title": "First", "dead_end": "yes", "conditions": "PDAC"},
+                {"nct_id": "EU-2023-1", "source": "CTIS", "title": "EU trial"},
+            ],
+        )
+        session.commit()
+        self.assertEqual((inserted, updated), (2, 0))
+
+        inserted, updated = bulk_upsert_trials(
+            session,
+            [
+                {"nct_id": "NCT00000001", "title": "First (updated)", "status": "COMPLETED"},
+                {"nct_id": "NCT00000002", "title": "Second"},
+                {"nct_id": "NCT00000002", "title": "Second (dup)", "evidence_strength": "low"},
+            ],
+            chunk_size=1,
+        )
+        session.commit()
+        self.assertEqual((inserted, updated), (1, 2))
+
+        first = session.get(ClinicalTrial, "NCT00000001")
+        self.assertEqual(first.title, "First (updated)")
+        self.assertEqual(first.status, "COMPLETED")
+        self.assertEqual(first.dead_end, "yes")
+        self.assertEqual(first.trial_link, "https://clinicaltrials.gov/study/NCT00000001")
+        self.assertEqual(first.details.conditions, "NA")
+        self.assertEqual(first.version, 2)
+
+        second = session.get(ClinicalTrial, "NCT00000002")
+        self.assertEqual(second.title, "Second (dup)")
+        self.assertEqual(second.evidence_strength, "low")
+        self.assertIsNone(second.dead_end)
+        self.assertEqual(second.version, 1)
+
+        first.status = "TERMINATED"
+        session.commit()
+        self.assertEqual(first.version, 3)
+
+        eu = session.get(ClinicalTrial, "EU-2023-1")
+        self.assertEqual(eu.source, "ctis")
+        self.assertEqual(eu.trial_link, "NA")
+        self.assertEqual(session.query(ClinicalTrialDetails).count(), 3)
+        session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,31 @@
+import io
+import sqlite3
 import unittest
+from pathlib import Path
 
 import pandas as pd
+from sqlalchemy import create_engine
 
-from frontend.dashboard import _build_query_mask, split_csv_values
+from db import models  # noqa: F401
+from db.session import Base
+from frontend import dashboard
+from frontend.dashboard import (
+    DISPLAY_COLUMNS,
+    FACET_COLUMNS,
+    TRIALS_QUERY,
+    _build_query_mask,
+    _csv_bytes,
+    _tokenize,
+    build_display_df,
+    build_facets,
+    build_value_matrices,
+    count_values,
+    db_version,
+    first_pubmed_links,
+    indicator_count_frame,
+    split_csv_values,
+    year_series,
+)
 
 
 class DashboardQueryTests(unittest.TestCase):
@@ -40,9 +63,130 @@ class DashboardQueryTests(unittest.TestCase):
         mask = _build_query_mask(self.df, "kras, registry")
         self.assertEqual(mask.tolist(), [True, False, False, True])
 
+    def test_regex_characters_in_terms_match_literally(self):
+        self.assertEqual(_build_query_mask(self.df, "phase.3").tolist(), [False, False, False, False])
+        self.assertEqual(_build_query_mask(self.df, "(pdac OR ta$").tolist(), [False, False, False, False])
+        self.assertEqual(_build_query_mask(self.df, "kras in").tolist(), [True, False, False, False])
+
+    def test_tokenize_matches_shell_style_quoting(self):
+        self.assertEqual(_tokenize('kras AND "phase 3"  OR x"y z"'), ["kras", "AND", "phase 3", "OR", "xy z"])
+        self.assertEqual(_tokenize('"unclosed phrase'), ['"unclosed', "phrase"])
+        self.assertEqual(_tokenize("crohn's disease"), ["crohn's", "disease"])
+
     def test_split_csv_values_drops_na_and_whitespace(self):
         self.assertEqual(split_csv_values("DRUG, PROCEDURE, NA, "), ["DRUG", "PROCEDURE"])
 
+    def test_first_pubmed_links_takes_first_non_blank_link(self):
+        links = pd.Series(["NA", "", " | https://p/1 | https://p/2", "https://p/3|", " "])
+        self.assertEqual(first_pubmed_links(links).tolist(), ["NA", "NA", "https://p/1", "https://p/3", "NA"])
+
+    def test_year_series_keeps_leading_four_digit_years(self):
+        dates = pd.Series(["2021-03-01", " 2019", "NA", "", "20x1-01-01"])
+        self.assertEqual(year_series(dates).tolist(), ["2021", "2019", "", "", ""])
+
+    def test_build_facets_sorts_and_splits_options(self):
+        df = pd.DataFrame({col: ["", "b", "a", "b"] for col in FACET_COLUMNS})
+        df["intervention_types"] = ["DRUG, RADIATION", "NA", "", "DRUG"]
+        df["publication_match_methods"] = ["nct_exact,pubmed_link", "NA", "NA", "nct_exact"]
+        df["focus_tags"] = ["biomarker,advanced_disease", "", "biomarker", "NA"]
+        df["admission_date"] = ["2021-03-01", "NA", "", "2019"]
+        df["last_update_date"] = ["2024-01-01", "2024-06", "x", ""]
+
+        matrices = build_value_matrices(df)
+        facets = build_facets(df, matrices)
+
+        self.assertEqual(facets["phase"], ["a", "b"])
+        self.assertEqual(facets["intervention_types"], ["DRUG", "RADIATION"])
+        self.assertEqual(facets["publication_match_methods"], ["nct_exact", "pubmed_link"])
+        self.assertEqual(facets["focus_tags"], ["NA", "advanced_disease", "biomarker"])
+        self.assertEqual(facets["admission_year"], ["2019", "2021"])
+        self.assertEqual(facets["update_year"], ["2024"])
+        self.assertEqual(matrices["intervention_types"]["DRUG"].tolist(), [True, False, False, True])
+
+    def test_build_display_df_labels_columns_and_resolves_nct_ref(self):
+        df = pd.DataFrame({col: ["x", "y"] for col in DISPLAY_COLUMNS if col != "nct_ref_id"})
+        df["nct_id"] = ["EU-2023-1", "NCT00000002"]
+        df["secondary_id"] = ["ISRCTN1, NCT00000009 ", "NA"]
+
+        display = build_display_df(df)
+
+        self.assertEqual(display.columns.tolist(), list(DISPLAY_COLUMNS.values()))
+        self.assertEqual(display["NCT ID"].tolist(), ["NCT00000009", "NCT00000002"])
+
+    def test_count_values_relabels_blanks_on_categoricals(self):
+        series = pd.Series(["x", "", "NA", "", "y", "x"]).astype("category")
+
+        counts = count_values(series[series != "y"], "NA")
+        self.assertEqual(counts.to_dict(), {"NA": 3, "x": 2})
+        self.assertEqual(count_values(series, blank_label=None).index.tolist(), ["x", "NA", "y"])
+
+    def test_load_query_joins_details_by_index(self):
+        db_path = Path("tests/tmp_dashboard_plan.db")
+        if db_path.exists():
+            db_path.unlink()
+        engine = create_engine(f"sqlite:///{db_path}")
+        Base.metadata.create_all(bind=engine)
+        engine.dispose()
+        conn = sqlite3.connect(db_path)
+        try:
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + TRIALS_QUERY)]
+        finally:
+            conn.close()
+            db_path.unlink()
+
+        details_steps = [step for step in plan if step.startswith(("SCAN d", "SEARCH d"))]
+        self.assertEqual(len(details_steps), 1)
+        self.assertTrue(details_steps[0].startswith("SEARCH d USING INDEX"), details_steps[0])
+
+    def test_indicator_count_frame_counts_items(self):
+        df = pd.DataFrame({"intervention_types": ["DRUG, RADIATION", "NA", "", "DRUG,PROCEDURE"]})
+        matrix = build_value_matrices(df.assign(publication_match_methods="", focus_tags=""))["intervention_types"]
+
+        counts = indicator_count_frame(matrix, df.index, "intervention_types", top=2)
+        self.assertEqual(counts.to_dict("list"), {"intervention_types": ["DRUG", "PROCEDURE"], "count": [2, 1]})
+        empty = indicator_count_frame(matrix, df.index[1:3], "intervention_types")
+        self.assertEqual(empty.to_dict("list"), {"intervention_types": ["NA"], "count": [0]})
+
+    def test_csv_bytes_round_trips_display_frame(self):
+        df = pd.DataFrame(
+            {
+                "Trial ID": ["NCT1", "EU-2"],
+                "Phase": pd.Series(["PHASE2", ""]).astype("category"),
+                "Title": ['KRAS, "G12C"', "line\nbreak"],
+                "Publication Lag (days)": [120.0, ""],
+                "Publication Count": [1, 0],
+            }
+        )
+
+        parsed = pd.read_csv(io.BytesIO(_csv_bytes(df)), dtype=str, keep_default_na=False)
+        expected = pd.read_csv(io.StringIO(df.to_csv(index=False)), dtype=str, keep_default_na=False)
+        self.assertTrue(parsed.equals(expected))
+
+    def test_db_version_moves_on_wal_commit(self):
+        db_path = Path("tests/tmp_dashboard_version.db")
+        original_path = dashboard.DB_PATH
+        dashboard.DB_PATH = db_path
+        writer = sqlite3.connect(db_path)
+        reader = sqlite3.connect(db_path)
+        try:
+            writer.execute("PRAGMA journal_mode=WAL")
+            writer.execute("CREATE TABLE t (x INTEGER)")
+            writer.commit()
+            reader.execute("SELECT COUNT(*) FROM t").fetchone()
+            main_mtime = db_path.stat().st_mtime_ns
+            before = db_version()
+
+            writer.execute("INSERT INTO t VALUES (1)")
+            writer.commit()
+
+            self.assertEqual(db_path.stat().st_mtime_ns, main_mtime)
+            self.assertNotEqual(db_version(), before)
+        finally:
+            reader.close()
+            writer.close()
+            dashboard.DB_PATH = original_path
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{db_path}{suffix}").unlink(missing_ok=True)
 
 if __name__ == "__main__":
     unittest.main()
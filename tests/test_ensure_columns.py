@@ -0,0 +1,62 @@
+import unittest
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from db.models import ClinicalTrial
+from db.session import Base
+from scripts.ingest_clinicaltrials import ensure_columns
+
+
+class EnsureColumnsTests(unittest.TestCase):
+    def setUp(self):
+        self.db_path = Path("tests/tmp_ensure_columns.db")
+        if self.db_path.exists():
+            self.db_path.unlink()
+        self.engine = create_engine(f"sqlite:///{self.db_path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+
+    def tearDown(self):
+        self.engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def test_normalises_legacy_full_match_flags(self):
+        session = self.Session()
+        session.execute(text("INSERT INTO clinical_trials (nct_id, version) VALUES ('NCT1', 0)"))
+        for flag in ("Yes", " YES ", "yes", "No", None):
+            session.execute(
+                text("INSERT INTO trial_publications (nct_id, is_full_match) VALUES ('NCT1', :flag)"),
+                {"flag": flag},
+            )
+        session.commit()
+
+        ensure_columns(session)
+
+        flags = [row[0] for row in session.execute(text("SELECT is_full_match FROM trial_publications ORDER BY id"))]
+        self.assertEqual(flags, ["yes", "yes", "yes", "no", None])
+        full = session.execute(text("SELECT COUNT(*) FROM trial_publications WHERE is_full_match = 'yes'")).scalar()
+        self.assertEqual(full, 3)
+        session.close()
+
+    def test_keeps_unknown_match_methods_loadable(self):
+        session = self.Session()
+        session.execute(text("INSERT INTO clinical_trials (nct_id, version) VALUES ('NCT1', 0)"))
+        for method in ("manual", " NCT_Exact ", "", None):
+            session.execute(
+                text("INSERT INTO trial_publications (nct_id, match_method) VALUES ('NCT1', :method)"),
+                {"method": method},
+            )
+        session.commit()
+
+        ensure_columns(session)
+
+        trial = session.get(ClinicalTrial, "NCT1")
+        self.assertEqual([pub.match_method for pub in trial.publications], ["manual", "nct_exact", None, None])
+        session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
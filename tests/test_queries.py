@@ -0,0 +1,106 @@
+import unittest
+from pathlib import Path
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import sessionmaker
+
+from db.models import ClinicalTrial, ClinicalTrialDetails, ClinicalTrialPublication
+from db.queries import get_trials_by_ids, list_trial_summaries, load_trial_fully
+from db.session import Base
+
+
+class QueryHelperTests(unittest.TestCase):
+    def setUp(self):
+        self.db_path = Path("tests/tmp_queries.db")
+        if self.db_path.exists():
+            self.db_path.unlink()
+        self.engine = create_engine(f"sqlite:///{self.db_path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+
+        session = self.Session()
+        for idx in range(100):
+            nct_id = f"NCT{idx:08d}"
+            session.add(ClinicalTrial(nct_id=nct_id, title=f"Trial {idx}", phase="PHASE2"))
+            session.add(ClinicalTrialDetails(nct_id=nct_id, conditions="Pancreatic cancer"))
+            session.add(
+                ClinicalTrialPublication(
+                    nct_id=nct_id,
+                    pmid=str(10000000 + idx),
+                    match_method="nct_exact",
+                    confidence=92,
+                    is_full_match="yes",
+                )
+            )
+        session.commit()
+        session.close()
+
+        self.statements = []
+        event.listen(self.engine, "before_cursor_execute", self._count_statement)
+
+    def tearDown(self):
+        event.remove(self.engine, "before_cursor_execute", self._count_statement)
+        self.engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def _count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def test_load_trial_fully_batches_relationships(self):
+        session = self.Session()
+        ids = [f"NCT{idx:08d}" for idx in range(100)]
+
+        trials = load_trial_fully(session, ids)
+        conditions = [t.details.conditions for t in trials]
+        summaries = [t.details.brief_summary for t in trials]
+        pmids = [p.pmid for t in trials for p in t.publications]
+
+        self.assertEqual(len(trials), 100)
+        self.assertEqual(set(conditions), {"Pancreatic cancer"})
+        self.assertEqual(len(pmids), 100)
+        self.assertEqual(set(summaries), {None})
+        self.assertLessEqual(len(self.statements), 4)
+        session.close()
+
+    def test_list_trial_summaries_projects_list_columns(self):
+        session = self.Session()
+
+        trials = list_trial_summaries(session)
+
+        self.assertEqual(len(trials), 100)
+        self.assertEqual((trials[0].nct_id, trials[0].title, trials[0].phase), ("NCT00000000", "Trial 0", "PHASE2"))
+        self.assertEqual(len(self.statements), 1)
+        self.assertNotIn("clinical_trial_details", self.statements[0])
+        self.assertNotIn("pdac_match_reason", self.statements[0])
+        with self.assertRaises(InvalidRequestError):
+            trials[0].details
+        session.close()
+
+    def test_get_trials_by_ids_reuses_identity_map(self):
+        session = self.Session()
+        loaded = session.get(ClinicalTrial, "NCT00000001")
+        self.statements.clear()
+
+        trials = get_trials_by_ids(session, ["NCT00000001", "NCT00000002", "NCT99999999", ""])
+
+        self.assertEqual(set(trials), {"NCT00000001", "NCT00000002"})
+        self.assertIs(trials["NCT00000001"], loaded)
+        trial_selects = [s for s in self.statements if "FROM clinical_trials" in s]
+        self.assertEqual(len(trial_selects), 1)
+        session.close()
+
+    def test_trial_pmids_come_from_publication_rows(self):
+        session = self.Session()
+        trial = session.get(ClinicalTrial, "NCT00000007")
+        session.add(ClinicalTrialPublication(nct_id=trial.nct_id, doi="10.1/abc", match_method="doi_reference"))
+        session.commit()
+        session.expire(trial, ["publications"])
+
+        self.assertEqual(trial.pmids, ["10000007"])
+        session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
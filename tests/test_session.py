@@ -0,0 +1,25 @@
+import sqlite3
+import unittest
+from pathlib import Path
+
+from db.session import _set_sqlite_pragmas
+
+
+class SqlitePragmaTests(unittest.TestCase):
+    def test_sets_wal_on_sqlite_connections(self):
+        conn = sqlite3.connect("tests/tmp_session_pragmas.db")
+        try:
+            _set_sqlite_pragmas(conn, None)
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        finally:
+            conn.close()
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"tests/tmp_session_pragmas.db{suffix}").unlink(missing_ok=True)
+
+    def test_skips_non_sqlite_connections(self):
+        # A non-SQLite DBAPI connection (e.g. psycopg) must not be sent pragmas.
+        _set_sqlite_pragmas(object(), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
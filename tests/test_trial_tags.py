@@ -0,0 +1,56 @@
+import unittest
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.models import ClinicalTrial, TrialTag
+from db.session import Base
+from scripts.ingest_clinicaltrials import sync_trial_tags
+
+
+class TrialTagSyncTests(unittest.TestCase):
+    def setUp(self):
+        self.db_path = Path("tests/tmp_trial_tags.db")
+        if self.db_path.exists():
+            self.db_path.unlink()
+        self.engine = create_engine(f"sqlite:///{self.db_path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine, autocommit=False, autoflush=False)
+
+    def tearDown(self):
+        self.engine.dispose()
+        if self.db_path.exists():
+            self.db_path.unlink()
+
+    def test_sync_follows_focus_tags(self):
+        session = self.Session()
+        session.add_all(
+            [
+                ClinicalTrial(nct_id="NCT1", focus_tags="biomarker, advanced_disease"),
+                ClinicalTrial(nct_id="NCT2", focus_tags="NA"),
+            ]
+        )
+        session.commit()
+
+        self.assertEqual(sync_trial_tags(session), 2)
+        self.assertEqual({t.tag for t in session.get(ClinicalTrial, "NCT1").tags}, {"biomarker", "advanced_disease"})
+        self.assertEqual(session.get(ClinicalTrial, "NCT2").tags, set())
+
+        session.get(ClinicalTrial, "NCT1").focus_tags = "biomarker,resectable"
+        session.commit()
+        self.assertEqual(sync_trial_tags(session), 2)
+        self.assertEqual(sync_trial_tags(session), 0)
+        self.assertEqual(
+            sorted(nct_id for (nct_id,) in session.query(TrialTag.nct_id).filter(TrialTag.tag == "resectable")),
+            ["NCT1"],
+        )
+
+        session.delete(session.get(ClinicalTrial, "NCT1"))
+        session.commit()
+        self.assertEqual(session.query(TrialTag).count(), 0)
+        session.close()
+
+
+if __name__ == "__main__":
+    unittest.main()